@@ -1,8 +1,28 @@
 from django.contrib import admin
-from .models import ApplicationType, Application, ApplicationComment, ApplicationField
+from .models import ApplicationType, Application, ApplicationComment, ApplicationField, ApplicationEvent, DocumentJob, \
+    OutboxEmail
 
 admin.site.register(ApplicationType)
 admin.site.register(Application)
 admin.site.register(ApplicationComment)
 admin.site.register(ApplicationField)
+admin.site.register(OutboxEmail)
+admin.site.register(DocumentJob)
 
+
+@admin.register(ApplicationEvent)
+class ApplicationEventAdmin(admin.ModelAdmin):
+    """Журнал только для просмотра: записи добавляет applications.workflow."""
+    list_display = ('created_at', 'application', 'kind', 'from_status', 'to_status', 'actor')
+    list_filter = ('kind', 'to_status', 'application_type')
+    list_select_related = ('application__application_type', 'application__student', 'actor')
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
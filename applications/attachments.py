@@ -0,0 +1,44 @@
+"""
+Контентно-адресуемое хранилище вложений к заявлениям.
+
+Файл сохраняется по пути uploads/<первые два символа sha256>/<sha256><расширение>,
+поэтому повторная загрузка того же содержимого не пишет на диск ничего нового.
+"""
+import hashlib
+import os
+
+from django.core.files.storage import default_storage
+
+ATTACHMENTS_DIR = 'uploads'
+
+
+def hash_file(file):
+    """sha256 содержимого, файл читается кусками по file.chunks()."""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_attachment_path(sha256, filename):
+    extension = os.path.splitext(filename)[1].lower()
+    return f'{ATTACHMENTS_DIR}/{sha256[:2]}/{sha256}{extension}'
+
+
+def store_attachment(file, storage=default_storage):
+    """
+    Сохраняет загруженный файл, если такого содержимого ещё нет, и возвращает путь в хранилище.
+
+    Django уже держит загрузку во временном файле или в памяти, так что проход
+    для хеширования дешёвый, а запись в хранилище происходит только для новых данных.
+    """
+    path = get_attachment_path(hash_file(file), file.name)
+    if storage.exists(path):
+        return path
+
+    file.seek(0)
+    saved_path = storage.save(path, file)
+    if saved_path != path:
+        # Тот же файл параллельно сохранил другой запрос — оставляем его копию.
+        storage.delete(saved_path)
+    return path
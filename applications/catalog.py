@@ -0,0 +1,41 @@
+"""
+Кеш каталога типов заявлений.
+
+Каталог меняется только через админку, поэтому он кешируется целиком под
+номером версии. Версия — время последнего изменения в наносекундах. Её
+сбрасывают сигналы из applications.signals, а API использует её как ETag
+и Last-Modified.
+"""
+import time
+
+from django.core.cache import cache
+
+from .models import ApplicationType
+
+VERSION_KEY = 'application-catalog:version'
+
+
+def get_catalog_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def get_catalog(request, version):
+    """Сериализованный список типов с полями. URL шаблонов абсолютные, поэтому кеш разделён по хосту."""
+    key = f'application-catalog:{version}:{request.get_host()}'
+    catalog = cache.get(key)
+    if catalog is None:
+        # serializers зависит от версии каталога через applications.schemas
+        from .serializers import ApplicationTypeSerializer
+
+        queryset = ApplicationType.objects.prefetch_related('fields').order_by('id')
+        catalog = ApplicationTypeSerializer(queryset, many=True, context={'request': request}).data
+        cache.set(key, catalog, None)
+    return catalog
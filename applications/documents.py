@@ -0,0 +1,58 @@
+"""
+Наложение подписей на документ заявления.
+
+Изображения подписей Pillow переводит в одностраничный PDF, а pypdf
+накладывает их на последнюю страницу sent_document: подпись студента слева
+внизу, проректора — справа. stamp_pdf работает только с байтами и не
+обращается к БД, поэтому воркер stamp_documents выполняет её в пуле
+процессов. Документы doc/docx и установки без pypdf подписываются без
+наложения (can_stamp).
+"""
+import io
+
+from PIL import Image, ImageOps
+
+try:
+    from pypdf import PdfReader, PdfWriter, Transformation
+except ImportError:
+    PdfReader = PdfWriter = Transformation = None
+
+
+class StampingUnavailable(Exception):
+    pass
+
+
+def can_stamp(name):
+    """Можно ли наложить подписи на документ с именем name."""
+    return PdfWriter is not None and bool(name) and name.lower().endswith('.pdf')
+
+
+def signature_page(image):
+    """Подпись в виде страницы PDF, 1 пиксель = 1 пункт; прозрачность сохраняется."""
+    with Image.open(io.BytesIO(image)) as picture:
+        picture = ImageOps.exif_transpose(picture)
+        has_alpha = picture.mode in ('RGBA', 'LA', 'PA') or 'transparency' in picture.info
+        buffer = io.BytesIO()
+        picture.convert('RGBA' if has_alpha else 'RGB').save(buffer, 'PDF', resolution=72)
+    return PdfReader(buffer).pages[0]
+
+
+def stamp_pdf(document, signatures, width=150, margin=36):
+    """
+    document — байты PDF, signatures — {'left' | 'right': байты изображения}.
+    Подписи масштабируются до width пунктов по ширине. Возвращает байты PDF.
+    """
+    if PdfWriter is None:
+        raise StampingUnavailable('Для подписания документов установите pypdf.')
+    writer = PdfWriter(clone_from=PdfReader(io.BytesIO(document)))
+    page = writer.pages[-1]
+    box = page.mediabox
+    for slot, image in signatures.items():
+        stamp = signature_page(image)
+        scale = width / float(stamp.mediabox.width)
+        x = float(box.left) + margin if slot == 'left' else float(box.right) - margin - width
+        page.merge_transformed_page(stamp, Transformation().scale(scale).translate(x, float(box.bottom) + margin))
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
@@ -0,0 +1,115 @@
+"""
+Выгрузка заявлений в CSV и XLSX.
+
+Заявления читаются iterator(chunk_size=...) и пачками превращаются в
+DataFrame: fields_data разворачивается pandas.json_normalize в колонки с
+ключами через точку, списки (в том числе списки объектов) остаются одной
+колонкой со значениями через «; », числа и даты получают свои типы. Набор
+колонок заранее собирается отдельным проходом по fields_data той же
+нормализацией, поэтому заголовок совпадает с ячейками, а CSV можно
+отдавать потоком, не держа выгрузку в памяти. XLSX
+пишется openpyxl в режиме write_only во временный файл; без openpyxl
+XLSX отвечает 501.
+"""
+import tempfile
+from itertools import islice
+
+import pandas as pd
+from django.conf import settings
+
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+FORMATS = ('csv', 'xlsx')
+
+BASE_COLUMNS = {
+    'id': 'id',
+    'student': 'student__username',
+    'student_email': 'student__email',
+    'application_type': 'application_type__name',
+    'status': 'status',
+    'submission_date': 'submission_date',
+    'status_changed_at': 'status_changed_at',
+    'updated_at': 'updated_at',
+}
+DATE_COLUMNS = ('submission_date', 'status_changed_at', 'updated_at')
+
+
+class ExportUnavailable(Exception):
+    pass
+
+
+def json_normalize(fields_data):
+    return pd.json_normalize([data if isinstance(data, dict) else {} for data in fields_data], sep='.') \
+        .add_prefix('field.')
+
+
+def normalize_fields(fields_data):
+    """DataFrame колонок field.<ключ> для списка fields_data."""
+    fields = json_normalize(fields_data)
+    for column in fields.columns:
+        values = fields[column]
+        if values.map(lambda value: isinstance(value, list)).any():
+            fields[column] = values.map(lambda value: '; '.join(map(str, value)) if isinstance(value, list) else value)
+    return fields
+
+
+def field_columns(queryset, chunk_size=2000):
+    """Колонки, которые normalize_fields даст для выгружаемых заявлений, — единственный источник заголовка."""
+    rows = queryset.order_by().values_list('fields_data', flat=True).iterator(chunk_size=chunk_size)
+    columns = set()
+    while chunk := list(islice(rows, chunk_size)):
+        columns.update(json_normalize(chunk).columns)
+    return sorted(columns)
+
+
+def iter_frames(queryset, columns, chunk_size=2000):
+    rows = queryset.order_by('id').values_list('fields_data', *BASE_COLUMNS.values()).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        yield make_frame(chunk, columns)
+
+
+def make_frame(chunk, columns):
+    base = pd.DataFrame([row[1:] for row in chunk], columns=list(BASE_COLUMNS))
+    for column in DATE_COLUMNS:
+        base[column] = pd.to_datetime(base[column], utc=True).dt.tz_convert(settings.TIME_ZONE).dt.tz_localize(None)
+
+    fields = normalize_fields([row[0] for row in chunk])
+    frame = pd.concat([base, fields], axis=1).reindex(columns=list(BASE_COLUMNS) + columns)
+    # Nullable-типы pandas: целые с пропусками остаются целыми, а не превращаются в 1.0
+    return frame.convert_dtypes()
+
+
+def iter_csv(frames, columns):
+    # BOM, чтобы Excel открыл кириллицу в UTF-8
+    yield '\ufeff' + pd.DataFrame(columns=list(BASE_COLUMNS) + columns).to_csv(index=False)
+    for frame in frames:
+        yield frame.to_csv(index=False, header=False, date_format='%Y-%m-%d %H:%M:%S')
+
+
+def write_xlsx(frames, columns, file):
+    if Workbook is None:
+        raise ExportUnavailable('Для выгрузки в XLSX установите openpyxl.')
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Заявления')
+    sheet.append(list(BASE_COLUMNS) + columns)
+    for frame in frames:
+        frame = frame.astype(object).where(frame.notna(), None)
+        for row in frame.itertuples(index=False, name=None):
+            sheet.append(row)
+    workbook.save(file)
+
+
+def export_xlsx(queryset, chunk_size=2000):
+    """Пишет XLSX во временный файл и возвращает его открытым на начале, файл удалится при закрытии."""
+    columns = field_columns(queryset)
+    file = tempfile.TemporaryFile(suffix='.xlsx')
+    try:
+        write_xlsx(iter_frames(queryset, columns, chunk_size), columns, file)
+    except BaseException:
+        file.close()
+        raise
+    file.seek(0)
+    return file
@@ -0,0 +1,79 @@
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import ApplicationFieldValue
+from .search import normalize_value
+
+
+class ApplicationFilterBackend(BaseFilterBackend):
+    """
+    Фильтры списков заявлений:
+
+    ?status=under_review,in_progress   статусы через запятую
+    ?type=1,2                          id типов заявлений
+    ?student=ivanov                    username студента
+    ?submitted_after=2024-09-01        дата или дата-время, включительно
+    ?submitted_before=2024-10-01T12:00
+    ?field.group=ИВТ-21                точное значение ключа fields_data (вложенные ключи через точку)
+    ?search=справка                    подстрока в любом значении fields_data
+
+    Фильтры по fields_data идут через таблицу ApplicationFieldValue: field.* —
+    по индексу (key, value), search — по триграммному индексу в PostgreSQL
+    (миграция 0017), в SQLite подстрока ищется просмотром таблицы.
+    """
+    field_prefix = 'field.'
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        if params.get('status'):
+            queryset = queryset.filter(status__in=params['status'].split(','))
+        if params.get('type'):
+            queryset = queryset.filter(application_type_id__in=self.parse_ids('type', params['type']))
+        if params.get('student'):
+            queryset = queryset.filter(student__username=params['student'])
+        if params.get('submitted_after'):
+            queryset = queryset.filter(submission_date__gte=self.parse_moment('submitted_after', params['submitted_after']))
+        if params.get('submitted_before'):
+            queryset = queryset.filter(submission_date__lte=self.parse_moment('submitted_before', params['submitted_before'], end=True))
+
+        for param, value in params.items():
+            if param.startswith(self.field_prefix) and value != '':
+                key = param[len(self.field_prefix):]
+                queryset = queryset.filter(id__in=ApplicationFieldValue.objects.filter(
+                    key=key, value=normalize_value(value)
+                ).values('application_id'))
+
+        if params.get('search'):
+            queryset = queryset.filter(id__in=ApplicationFieldValue.objects.filter(
+                search_value__contains=params['search'].casefold()
+            ).values('application_id'))
+
+        return queryset
+
+    @staticmethod
+    def parse_ids(name, value):
+        try:
+            return [int(item) for item in value.split(',')]
+        except ValueError:
+            raise ValidationError({name: 'Ожидается список id через запятую.'})
+
+    @staticmethod
+    def parse_moment(name, value, end=False):
+        try:
+            moment = parse_datetime(value)
+            if moment is None:
+                day = parse_date(value)
+                if day is not None:
+                    moment = datetime.combine(day, time.max if end else time.min)
+        except ValueError:
+            moment = None
+        if moment is None:
+            raise ValidationError({name: 'Ожидается дата или дата-время в формате ISO 8601.'})
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
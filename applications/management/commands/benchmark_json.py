@@ -0,0 +1,72 @@
+import io
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from applications.serializers import ApplicationListSerializer, ApplicationSerializer
+from applications.views import ProrectorApplicationListViewSet
+from config import renderers
+from config.renderers import FastJSONParser, FastJSONRenderer
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время рендеринга и разбора JSON стандартным json (DRF) и orjson (config.renderers) '
+        'на ответе очереди проректора. Данные для заметного объёма создаёт seed_benchmark_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Заявлений в ответе.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--flat', action='store_true', help='Плоские строки, как в ?flat=1.')
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            raise CommandError('orjson не установлен: FastJSONRenderer работает как стандартный JSONRenderer.')
+
+        data = self.build_payload(options['rows'], options['flat'])
+        if not data:
+            raise CommandError('Очередь проректора пуста, сначала запустите seed_benchmark_data.')
+
+        rows = []
+        for label, renderer, parser in (
+            ('json (DRF)', JSONRenderer(), JSONParser()),
+            ('orjson', FastJSONRenderer(), FastJSONParser()),
+        ):
+            body = renderer.render(data)
+            render = self.measure(lambda: renderer.render(data), options['repeat'])
+            parse = self.measure(lambda: parser.parse(io.BytesIO(body), parser_context={}), options['repeat'])
+            rows.append((label, render, parse, len(body)))
+
+        self.stdout.write(f'Заявлений: {len(data)}, повторов: {options["repeat"]}')
+        self.stdout.write(f'{"":<12}{"render, мс":>12}{"parse, мс":>12}{"размер, КБ":>12}')
+        for label, render, parse, size in rows:
+            self.stdout.write(f'{label:<12}{render:>12.2f}{parse:>12.2f}{size / 1024:>12.1f}')
+        (_, base_render, base_parse, _), (_, fast_render, fast_parse, _) = rows
+        self.stdout.write(self.style.SUCCESS(
+            f'Ускорение: render ×{base_render / fast_render:.1f}, parse ×{base_parse / fast_parse:.1f}'
+        ))
+
+    def build_payload(self, rows, flat):
+        """Результаты страницы list-for-prorector на rows заявлений, как их отдаёт сериализатор."""
+        queryset = ProrectorApplicationListViewSet.queryset.order_by(*ProrectorApplicationListViewSet.cursor_ordering)
+        request = Request(APIRequestFactory().get('/api/applications/list-for-prorector/'))
+        context = {'request': request}
+        if flat:
+            values = ApplicationListSerializer.get_values(request)
+            return ApplicationListSerializer(queryset.values(*values)[:rows], many=True, context=context).data
+        return ApplicationSerializer(queryset[:rows], many=True, context=context).data
+
+    @staticmethod
+    def measure(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings) * 1000
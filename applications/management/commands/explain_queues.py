@@ -0,0 +1,97 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from applications.urls import router
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN для запросов всех очередей заявлений (первая страница и страница по курсору) '
+        'и завершается ошибкой, если план содержит полное сканирование таблицы или сортировку во временном B-дереве.'
+    )
+
+    def handle(self, *args, **options):
+        problems = []
+
+        for name, queryset in self.get_queue_queries():
+            plan = self.explain(queryset)
+            issues = self.find_issues(plan, queryset.model._meta.db_table)
+            status = 'FAIL' if issues else 'OK'
+            self.stdout.write(f'[{status}] {name}\n{self.indent(plan)}')
+            problems.extend(f'{name}: {issue}' for issue in issues)
+
+        if problems:
+            raise CommandError('Неэффективные планы запросов:\n' + '\n'.join(problems))
+        self.stdout.write(self.style.SUCCESS('Все очереди используют индексы.'))
+
+    def get_queue_queries(self):
+        """Запросы страниц для каждой очереди с keyset-пагинацией и каждой роли пользователя."""
+        factory = APIRequestFactory()
+        seen = set()
+
+        for prefix, viewset, basename in router.registry:
+            ordering = getattr(viewset, 'cursor_ordering', None)
+            if ordering is None:
+                continue
+
+            paginator = viewset.pagination_class()
+            position = [self.sample_value(viewset.queryset.model, field) for field in ordering]
+            for role in User.Roles.values:
+                view = viewset(action='list', format_kwarg=None, kwargs={})
+                view.request = Request(factory.get(f'/{prefix}/'))
+                view.request.user = User(pk=0, role=role)
+
+                queryset = view.get_queryset().order_by(*ordering)
+                pages = {
+                    'первая страница': queryset,
+                    'по курсору': queryset.filter(paginator.get_keyset_filter(ordering, position)),
+                }
+                for page, page_queryset in pages.items():
+                    page_queryset = page_queryset[:paginator.page_size + 1]
+                    sql = str(page_queryset.query)
+                    if sql in seen:
+                        continue
+                    seen.add(sql)
+                    yield f'{prefix} ({role}, {page})', page_queryset
+
+    @staticmethod
+    def sample_value(model, field):
+        model_field = model._meta.get_field(field.lstrip('-'))
+        if isinstance(model_field, models.DateTimeField):
+            return timezone.now()
+        return 0
+
+    @staticmethod
+    def explain(queryset):
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # На маленьких таблицах планировщик предпочтёт seq scan; проверяем, что индекс вообще применим.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+                    cursor.execute('SET LOCAL enable_sort = off')
+            return queryset.explain()
+
+    @staticmethod
+    def find_issues(plan, table):
+        issues = []
+        if connection.vendor == 'sqlite':
+            if re.search(rf'\bSCAN {re.escape(table)}\b(?! USING)', plan):
+                issues.append('полное сканирование таблицы')
+            if 'USE TEMP B-TREE' in plan:
+                issues.append('сортировка во временном B-дереве')
+        elif connection.vendor == 'postgresql':
+            if 'Seq Scan' in plan:
+                issues.append('полное сканирование таблицы')
+            if re.search(r'\bSort\b', plan):
+                issues.append('сортировка вне индекса')
+        return issues
+
+    @staticmethod
+    def indent(plan):
+        return '\n'.join(f'    {line}' for line in plan.splitlines())
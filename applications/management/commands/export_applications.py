@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from applications.export import FORMATS, ExportUnavailable, field_columns, iter_csv, iter_frames, write_xlsx
+from applications.models import Application
+
+
+class Command(BaseCommand):
+    help = 'Выгружает заявления с развёрнутыми fields_data в CSV или XLSX пачками, не загружая всё в память.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Путь к файлу выгрузки.')
+        parser.add_argument('--format', choices=FORMATS, help='По умолчанию определяется по расширению файла.')
+        parser.add_argument('--status', action='append', help='Только заявления в статусе, можно повторять.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        output = options['output']
+        export_format = options['format'] or output.rpartition('.')[2].lower()
+        if export_format not in FORMATS:
+            raise CommandError(f'Неизвестный формат {export_format!r}, укажите --format.')
+
+        queryset = Application.objects.all()
+        if options['status']:
+            queryset = queryset.filter(status__in=options['status'])
+        columns = field_columns(queryset)
+        frames = iter_frames(queryset, columns, options['chunk_size'])
+
+        try:
+            if export_format == 'xlsx':
+                with open(output, 'wb') as file:
+                    write_xlsx(frames, columns, file)
+            else:
+                with open(output, 'w', encoding='utf-8', newline='') as file:
+                    file.writelines(iter_csv(frames, columns))
+        except ExportUnavailable as error:
+            raise CommandError(str(error))
+
+        self.stdout.write(self.style.SUCCESS(f'Выгрузка сохранена в {output}'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from applications.models import Application
+from config.thumbnails import generate_thumbnails, is_image, media_name_from_url
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие миниатюры аватаров, подписей и вложений-изображений (синхронно, без фонового пула).'
+
+    def handle(self, *args, **options):
+        names = set(User.objects.exclude(avatar='').values_list('avatar', flat=True))
+        for signature, fields_data in Application.objects.values_list('student_signature', 'fields_data').iterator():
+            names.add(signature)
+            if isinstance(fields_data, dict):
+                names.update(media_name_from_url(value) for value in fields_data.values())
+
+        created = failed = 0
+        for name in sorted(filter(is_image, names)):
+            try:
+                created += generate_thumbnails(name)
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f'{name}: {error}')
+
+        self.stdout.write(self.style.SUCCESS(f'Создано миниатюр: {created}, ошибок: {failed}'))
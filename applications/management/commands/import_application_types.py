@@ -0,0 +1,51 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from applications.models import ApplicationField, ApplicationType
+
+COLUMNS = ('type', 'description', 'field', 'field_type', 'is_required')
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует типы заявлений и их поля из CSV: type, description, field, field_type, is_required. '
+        'Одна строка — одно поле типа; существующие типы и поля с тем же именем переиспользуются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV-файл в UTF-8.')
+
+    def handle(self, *args, **options):
+        field_types = {field_type for field_type, _ in ApplicationField.FIELD_TYPES}
+        with open(options['path'], encoding='utf-8-sig', newline='') as file:
+            reader = csv.DictReader(file)
+            missing = [column for column in COLUMNS[:1] + COLUMNS[2:4] if column not in (reader.fieldnames or ())]
+            if missing:
+                raise CommandError(f'В файле нет колонок: {", ".join(missing)}.')
+            rows = [(reader.line_num, row) for row in reader]
+
+        errors = [
+            f'Строка {line}: неизвестный тип поля {row["field_type"]!r}.'
+            for line, row in rows if row['field_type'] not in field_types
+        ]
+        if errors:
+            raise CommandError('\n'.join(errors))
+
+        types = {application_type.name: application_type for application_type in ApplicationType.objects.all()}
+        fields = {(field.name, field.field_type): field for field in ApplicationField.objects.all()}
+        with transaction.atomic():
+            for _, row in rows:
+                name = row['type'].strip()
+                if name not in types:
+                    types[name] = ApplicationType.objects.create(name=name, description=row.get('description') or '')
+                key = (row['field'].strip(), row['field_type'])
+                if key not in fields:
+                    fields[key] = ApplicationField.objects.create(
+                        name=key[0], field_type=key[1],
+                        is_required=(row.get('is_required') or 'true').strip().lower() in ('1', 'true', 'да', 'yes'),
+                    )
+                types[name].fields.add(fields[key])
+
+        self.stdout.write(self.style.SUCCESS(f'Обработано строк: {len(rows)}'))
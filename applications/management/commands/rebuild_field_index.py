@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from applications.models import Application, ApplicationFieldValue
+from applications.search import bulk_index_field_values
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает таблицу ApplicationFieldValue по fields_data всех заявлений (например, после bulk_create).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+
+        with transaction.atomic():
+            ApplicationFieldValue.objects.all().delete()
+            rows = Application.objects.values_list('id', 'fields_data').order_by('id').iterator(chunk_size=chunk_size)
+            total = bulk_index_field_values(rows, chunk_size=chunk_size)
+
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано значений: {total}'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from applications.statistics import compute_rollups, read_rollups, write_rollups
+
+TABLES = ('по статусам', 'по дням', 'время до готовности')
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводные таблицы статистики по заявлениям и сообщает о расхождениях. Запускать раз в сутки.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Только показать расхождения.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            expected = compute_rollups()
+            current = read_rollups()
+            for name, wanted, actual in zip(TABLES, expected, current):
+                drift = {key for key in wanted.keys() | actual.keys() if wanted[key] != actual[key]}
+                self.stdout.write(f'{name}: строк {len(wanted)}, расхождений {len(drift)}')
+
+            if not options['dry_run']:
+                write_rollups(expected)
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS('Сводные таблицы пересчитаны.'))
@@ -0,0 +1,209 @@
+import json
+import statistics
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .seed_benchmark_data import PREFIX
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+PDF_STUB = b'%PDF-1.4\n1 0 obj<<>>endobj\ntrailer<<>>\n%%EOF\n'
+# Белый PNG 1×1 для полей-изображений и подписей
+PNG_STUB = (b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x00\x00\x00\x00:~\x9bU'
+            b'\x00\x00\x00\nIDATx\x9cc\xf8\x0f\x00\x01\x01\x01\x00\xb18\xf6\x14\x00\x00\x00\x00IEND\xaeB`\x82')
+
+
+class Client:
+    """Минимальный HTTP-клиент на urllib, чтобы бенчмарк не требовал дополнительных зависимостей."""
+
+    def __init__(self, base_url, timings):
+        self.base_url = base_url.rstrip('/')
+        self.timings = timings
+        self.lock = threading.Lock()
+
+    def request(self, label, method, path, token=None, json_body=None, fields=None, files=None):
+        headers = {}
+        data = None
+        if json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        elif fields is not None or files is not None:
+            data, content_type = self.encode_multipart(fields or {}, files or {})
+            headers['Content-Type'] = content_type
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+
+        request = Request(self.base_url + path, data=data, headers=headers, method=method)
+        start = time.perf_counter()
+        try:
+            with urlopen(request) as response:
+                body = response.read()
+        except HTTPError as error:
+            raise CommandError(f'{method} {path}: {error.code} {error.read()[:500]!r}')
+        elapsed = time.perf_counter() - start
+
+        with self.lock:
+            self.timings[label].append(elapsed)
+        return json.loads(body) if body else None
+
+    @staticmethod
+    def encode_multipart(fields, files):
+        boundary = uuid.uuid4().hex
+        parts = []
+        for name, value in fields.items():
+            parts.append(
+                f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+            )
+        for name, (filename, content) in files.items():
+            parts.append(
+                f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                f'Content-Type: application/octet-stream\r\n\r\n'.encode() + content + b'\r\n'
+            )
+        parts.append(f'--{boundary}--\r\n'.encode())
+        return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест сценария подача → проверка → принятие → завершение против запущенного сервера. '
+        'Выводит p50/p95/p99 и пропускную способность по эндпоинтам и сравнивает с сохранённым baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--password', default='bench-password')
+        parser.add_argument('--students', type=int, default=10, help='Сколько студентов из seed_benchmark_data участвует.')
+        parser.add_argument('--iterations', type=int, default=50, help='Число полных сценариев.')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--output', help='Куда сохранить результаты в JSON.')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+        parser.add_argument('--save-baseline', action='store_true', help='Записать результаты как новый baseline.')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Допустимый рост p95 относительно baseline (0.2 = 20%%).')
+
+    def handle(self, *args, **options):
+        timings = defaultdict(list)
+        client = Client(options['base_url'], timings)
+
+        reviewer = self.login(client, f'{PREFIX}reviewer', options['password'])
+        prorector = self.login(client, f'{PREFIX}prorector', options['password'])
+        students = [
+            self.login(client, f'{PREFIX}student{index}', options['password'])
+            for index in range(options['students'])
+        ]
+        catalog = client.request('catalog', 'GET', '/api/applications/types/')
+        types = [item for item in catalog if item['name'].startswith(PREFIX)]
+        if not types or not students:
+            raise CommandError('Нет данных бенчмарка, сначала выполните seed_benchmark_data.')
+        timings.clear()
+
+        def scenario(iteration):
+            student = students[iteration % len(students)]
+            application_type = types[iteration % len(types)]
+
+            client.request('catalog', 'GET', '/api/applications/types/')
+            fields_data, files = self.submission(application_type, iteration)
+            created = client.request(
+                'submit', 'POST', '/api/applications/list/', token=student,
+                fields={
+                    'application_type': application_type['id'],
+                    'fields_data': json.dumps(fields_data, ensure_ascii=False),
+                },
+                files=files,
+            )
+            client.request('student-list', 'GET', '/api/applications/list/', token=student)
+            client.request('review-queue', 'GET', '/api/applications/list-for-preview/', token=reviewer)
+            client.request('accept', 'POST', f'/api/applications/list/{created["id"]}/accept/', token=reviewer)
+            client.request('prorector-queue', 'GET', '/api/applications/list-for-prorector/', token=prorector)
+            client.request(
+                'complete', 'POST', f'/api/applications/list/{created["id"]}/complete/', token=prorector,
+                files={'ready_document': ('ready.pdf', PDF_STUB)},
+            )
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            list(executor.map(scenario, range(options['iterations'])))
+        elapsed = time.perf_counter() - start
+
+        results = self.summarize(timings, elapsed, options)
+        self.report(results)
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2, ensure_ascii=False))
+        baseline_path = Path(options['baseline'])
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+            self.stdout.write(f'Baseline сохранён в {baseline_path}')
+        elif baseline_path.exists():
+            self.compare(results, json.loads(baseline_path.read_text()), options['tolerance'])
+
+    @staticmethod
+    def login(client, username, password):
+        tokens = client.request('token', 'POST', '/api/users/token/',
+                                json_body={'username': username, 'password': password})
+        return tokens['access']
+
+    @staticmethod
+    def submission(application_type, iteration):
+        """fields_data и файлы для всех полей типа, чтобы заявление прошло проверку applications.schemas."""
+        fields_data = {'group': 'ИВТ-21', 'course': 2}
+        files = {'attachment': (f'scan{iteration}.pdf', PDF_STUB + str(iteration).encode())}
+        for field in application_type['fields']:
+            if field['field_type'] == 'text':
+                fields_data[field['name']] = 'Прошу выдать справку'
+            elif field['field_type'] == 'document':
+                files[field['name']] = (f'document{iteration}.pdf', PDF_STUB + str(iteration).encode())
+            else:
+                files[field['name']] = ('image.png', PNG_STUB)
+        return fields_data, files
+
+    @staticmethod
+    def summarize(timings, elapsed, options):
+        endpoints = {}
+        for label, values in sorted(timings.items()):
+            percentiles = statistics.quantiles(values, n=100, method='inclusive') if len(values) > 1 else values * 99
+            endpoints[label] = {
+                'count': len(values),
+                'mean_ms': round(statistics.fmean(values) * 1000, 2),
+                'p50_ms': round(percentiles[49] * 1000, 2),
+                'p95_ms': round(percentiles[94] * 1000, 2),
+                'p99_ms': round(percentiles[98] * 1000, 2),
+                'throughput_rps': round(len(values) / elapsed, 2),
+            }
+        return {
+            'iterations': options['iterations'],
+            'concurrency': options['concurrency'],
+            'elapsed_s': round(elapsed, 3),
+            'scenarios_per_s': round(options['iterations'] / elapsed, 2),
+            'endpoints': endpoints,
+        }
+
+    def report(self, results):
+        self.stdout.write(f'{"endpoint":<18}{"count":>7}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"rps":>9}')
+        for label, stats in results['endpoints'].items():
+            self.stdout.write(
+                f'{label:<18}{stats["count"]:>7}{stats["p50_ms"]:>10}{stats["p95_ms"]:>10}'
+                f'{stats["p99_ms"]:>10}{stats["throughput_rps"]:>9}'
+            )
+        self.stdout.write(f'Сценариев в секунду: {results["scenarios_per_s"]} за {results["elapsed_s"]} с')
+
+    def compare(self, results, baseline, tolerance):
+        regressions = []
+        for label, stats in results['endpoints'].items():
+            previous = baseline['endpoints'].get(label)
+            if previous and stats['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+                regressions.append(f'{label}: p95 {stats["p95_ms"]} мс против {previous["p95_ms"]} мс в baseline')
+
+        if regressions:
+            raise CommandError('Регрессия производительности:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Результаты в пределах baseline.'))
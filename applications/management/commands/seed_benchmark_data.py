@@ -0,0 +1,132 @@
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from applications.attachments import store_attachment
+from applications.models import Application, ApplicationField, ApplicationType
+from applications.search import bulk_index_field_values
+from users.models import User
+
+PREFIX = 'bench_'
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт синтетические данные для нагрузочного теста: студентов, типы с полями, заявления с вложениями. '
+        'Повторный запуск дополняет данные до заданных количеств, не создавая дубликатов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=100)
+        parser.add_argument('--types', type=int, default=10)
+        parser.add_argument('--fields', type=int, default=5, help='Полей на тип заявления.')
+        parser.add_argument('--applications', type=int, default=1000)
+        parser.add_argument('--attachments', type=int, default=20,
+                            help='Сколько разных файлов-вложений сгенерировать, заявления ссылаются на них.')
+        parser.add_argument('--password', default='bench-password')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true', help='Удалить ранее созданные данные бенчмарка.')
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+
+        with transaction.atomic():
+            if options['clear']:
+                self.clear()
+
+            password = make_password(options['password'])
+            staff = self.create_staff(password)
+            students = self.create_students(options['students'], password)
+            types = self.create_types(options['types'], options['fields'])
+            attachments = self.create_attachments(options['attachments'], options['seed'])
+            created = self.create_applications(options['applications'], students, types, attachments)
+            # bulk_create обходит журнал, сводные таблицы статистики пересчитываем целиком
+            call_command('reconcile_statistics', stdout=self.stdout)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: {len(students)} студентов, {len(staff)} сотрудников, {len(types)} типов, '
+            f'{options["applications"]} заявлений (новых {created}). Пароль пользователей: {options["password"]}'
+        ))
+
+    def clear(self):
+        Application.objects.filter(student__username__startswith=PREFIX).delete()
+        ApplicationType.objects.filter(name__startswith=PREFIX).delete()
+        ApplicationField.objects.filter(name__startswith=PREFIX).delete()
+        User.objects.filter(username__startswith=PREFIX).delete()
+
+    def create_staff(self, password):
+        staff = []
+        for role in (User.Roles.REVIEWER, User.Roles.PRORECTOR):
+            user, _ = User.objects.update_or_create(
+                username=f'{PREFIX}{role}',
+                defaults={'role': role, 'password': password, 'email': f'{PREFIX}{role}@example.com'},
+            )
+            staff.append(user)
+        return staff
+
+    def create_students(self, count, password):
+        existing = User.objects.filter(username__startswith=f'{PREFIX}student').count()
+        User.objects.bulk_create([
+            User(username=f'{PREFIX}student{index}', email=f'{PREFIX}student{index}@example.com',
+                 password=password, role=User.Roles.STUDENT)
+            for index in range(existing, count)
+        ], batch_size=1000)
+        return list(User.objects.filter(username__startswith=f'{PREFIX}student').order_by('id')[:count])
+
+    def create_types(self, count, fields_per_type):
+        field_types = [field_type for field_type, _ in ApplicationField.FIELD_TYPES]
+        types = []
+        for index in range(count):
+            # Типы ищутся по имени: повторный запуск использует их, а не создаёт копии
+            application_type, created = ApplicationType.objects.get_or_create(
+                name=f'{PREFIX}Тип {index}', defaults={'description': 'Синтетический тип для нагрузочного теста'},
+            )
+            if created:
+                fields = ApplicationField.objects.bulk_create([
+                    ApplicationField(name=f'{PREFIX}Поле {index}.{number}', field_type=random.choice(field_types),
+                                     is_required=random.random() < 0.7)
+                    for number in range(fields_per_type)
+                ])
+                application_type.fields.add(*fields)
+            types.append(application_type)
+        return types
+
+    def create_attachments(self, count, seed):
+        # Отдельный генератор: содержимое зависит только от --seed, при повторном запуске
+        # файлы совпадают и хранилище с адресацией по содержимому не копит дубликаты
+        generator = random.Random(seed)
+        urls = []
+        for index in range(count):
+            content = ContentFile(generator.randbytes(generator.randint(10, 200) * 1024), name=f'attachment{index}.pdf')
+            urls.append(default_storage.url(store_attachment(content)))
+        return urls
+
+    def create_applications(self, count, students, types, attachments):
+        """Дополняет заявления бенчмарка до count, возвращает число новых."""
+        count -= Application.objects.filter(student__username__startswith=PREFIX).count()
+        if count <= 0:
+            return 0
+        statuses = Application.Status.values
+        groups = [f'ИВТ-{year}' for year in range(19, 25)]
+        applications = Application.objects.bulk_create([
+            Application(
+                student=random.choice(students),
+                application_type=random.choice(types),
+                status=random.choice(statuses),
+                fields_data={
+                    'group': random.choice(groups),
+                    'course': random.randint(1, 4),
+                    'comment': 'Прошу выдать справку об обучении',
+                    **({'attachment': random.choice(attachments)} if attachments else {}),
+                },
+            )
+            for _ in range(count)
+        ], batch_size=1000)
+        # bulk_create не вызывает сигналы, индекс fields_data заполняем явно
+        bulk_index_field_values((application.pk, application.fields_data) for application in applications)
+        return len(applications)
@@ -0,0 +1,104 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from applications.models import OutboxEmail
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из outbox пачками через одно SMTP-соединение с повторами и backoff.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--max-attempts', type=int, default=5)
+        parser.add_argument('--backoff', type=int, default=30,
+                            help='Базовая задержка перед повтором в секундах, удваивается с каждой попыткой.')
+        parser.add_argument('--max-backoff', type=int, default=3600)
+        parser.add_argument('--lease', type=int, default=300,
+                            help='На сколько секунд пачка берётся в работу: если воркер упадёт, '
+                                 'письма отправит другой после этой задержки.')
+        parser.add_argument('--loop', action='store_true', help='Работать постоянно, опрашивая outbox.')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Пауза между опросами пустого outbox в режиме --loop.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.connection = get_connection(fail_silently=False)
+
+        try:
+            while True:
+                processed = self.drain_batch()
+                if processed:
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            self.connection.close()
+
+    def drain_batch(self):
+        batch = self.claim_batch()
+        if not batch:
+            return 0
+
+        # SMTP — вне транзакции: строки outbox не заблокированы на время отправки
+        sent = 0
+        for email in batch:
+            try:
+                self.send(email)
+            except Exception as exc:
+                self.schedule_retry(email, exc)
+            else:
+                email.status = OutboxEmail.Status.SENT
+                email.sent_at = timezone.now()
+                email.last_error = ''
+                sent += 1
+            email.save(update_fields=['status', 'last_error', 'next_attempt_at', 'sent_at'])
+
+        self.stdout.write(f'Отправлено {sent} из {len(batch)}')
+        return len(batch)
+
+    def claim_batch(self):
+        now = timezone.now()
+        with transaction.atomic():
+            batch = list(
+                OutboxEmail.objects.select_for_update(skip_locked=True)
+                .filter(status=OutboxEmail.Status.PENDING, next_attempt_at__lte=now)
+                .order_by('id')[:self.options['batch_size']]
+            )
+            # Пачка берётся в аренду до коммита: другие воркеры её не видят, пока не истечёт --lease
+            for email in batch:
+                email.attempts += 1
+                email.next_attempt_at = now + timedelta(seconds=self.options['lease'])
+            OutboxEmail.objects.bulk_update(batch, ['attempts', 'next_attempt_at'])
+        return batch
+
+    def send(self, email):
+        # Соединение открывается один раз и переиспользуется между письмами и пачками.
+        self.connection.open()
+        message = EmailMessage(
+            email.subject, email.body,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[email.recipient],
+            connection=self.connection,
+        )
+        try:
+            message.send()
+        except Exception:
+            # После ошибки соединение может быть в неизвестном состоянии — переоткроем его.
+            self.connection.close()
+            raise
+
+    def schedule_retry(self, email, exc):
+        email.last_error = f'{type(exc).__name__}: {exc}'
+        if email.attempts >= self.options['max_attempts']:
+            email.status = OutboxEmail.Status.FAILED
+            return
+
+        delay = min(self.options['backoff'] * 2 ** (email.attempts - 1), self.options['max_backoff'])
+        email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
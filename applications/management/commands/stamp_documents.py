@@ -0,0 +1,153 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from applications import workflow
+from applications.documents import PdfWriter, stamp_pdf
+from applications.models import Application, DocumentJob
+from utils import queue_status_change_email
+
+
+class StaleJob(Exception):
+    """Заявление уже не ждёт подписания: задание отменяется без повторов."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Накладывает подписи на документы заявлений из очереди DocumentJob в пуле процессов, '
+        'сохраняет ready_document и переводит заявления в статус «Готово».'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--workers', type=int, help='Процессов для обработки PDF, по умолчанию по числу ядер.')
+        parser.add_argument('--max-attempts', type=int, default=3)
+        parser.add_argument('--backoff', type=int, default=60,
+                            help='Базовая задержка перед повтором в секундах, удваивается с каждой попыткой.')
+        parser.add_argument('--max-backoff', type=int, default=3600)
+        parser.add_argument('--loop', action='store_true', help='Работать постоянно, опрашивая очередь.')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Пауза между опросами пустой очереди в режиме --loop.')
+
+    def handle(self, *args, **options):
+        if PdfWriter is None:
+            raise CommandError('Для подписания документов установите pypdf.')
+        self.options = options
+
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                processed = self.drain_batch(pool)
+                if processed:
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+
+    def drain_batch(self, pool):
+        batch = self.claim_batch()
+        if not batch:
+            return 0
+
+        applications = Application.objects.select_related('student', 'application_type') \
+            .in_bulk([job.application_id for job in batch])
+        futures = {}
+        for job in batch:
+            job.application = applications[job.application_id]
+            try:
+                self.check_status(job.application)
+                document, signatures = self.read_inputs(job.application)
+            except StaleJob as exc:
+                self.cancel(job, exc)
+                continue
+            except Exception as exc:
+                self.schedule_retry(job, exc)
+                continue
+            future = pool.submit(stamp_pdf, document, signatures,
+                                 settings.DOCUMENT_STAMP_WIDTH, settings.DOCUMENT_STAMP_MARGIN)
+            futures[future] = job
+
+        # Сохраняем результаты по мере готовности, каждое заявление в своей транзакции
+        done = 0
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                self.finish(job, future.result())
+            except StaleJob as exc:
+                self.cancel(job, exc)
+            except Exception as exc:
+                self.schedule_retry(job, exc)
+            else:
+                done += 1
+
+        self.stdout.write(f'Подписано {done} из {len(batch)}')
+        return len(batch)
+
+    def claim_batch(self):
+        now = timezone.now()
+        with transaction.atomic():
+            batch = list(
+                DocumentJob.objects.select_for_update(skip_locked=True)
+                .filter(status=DocumentJob.Status.PENDING, next_attempt_at__lte=now)
+                .order_by('id')[:self.options['batch_size']]
+            )
+            # Задание берётся в аренду: если воркер упадёт, его подхватят после задержки повтора
+            for job in batch:
+                job.attempts += 1
+                job.next_attempt_at = now + self.retry_delay(job.attempts)
+            DocumentJob.objects.bulk_update(batch, ['attempts', 'next_attempt_at'])
+        return batch
+
+    def read_inputs(self, application):
+        if not application.sent_document.name.lower().endswith('.pdf'):
+            raise ValueError('У заявления нет PDF-документа для подписания.')
+        with application.sent_document.open('rb') as file:
+            document = file.read()
+        signatures = {}
+        for slot, signature in (('left', application.student_signature), ('right', application.prorector_signature)):
+            if signature:
+                with signature.open('rb') as file:
+                    signatures[slot] = file.read()
+        return document, signatures
+
+    @staticmethod
+    def check_status(application):
+        if application.status not in DocumentJob.SIGNABLE_STATUSES:
+            raise StaleJob(f'Заявление уже в статусе «{application.get_status_display()}»')
+
+    def finish(self, job, content):
+        with transaction.atomic():
+            # Пока шла обработка, заявление могли отклонить: статус проверяется заново под блокировкой
+            application = Application.objects.select_for_update().get(pk=job.application_id)
+            self.check_status(application)
+            application.ready_document.save(f'{application.pk}.pdf', ContentFile(content), save=False)
+            workflow.transition(application, Application.Status.COMPLETED, job.actor)
+            queue_status_change_email(application.student.email, application, application.get_status_display())
+
+            job.status = DocumentJob.Status.DONE
+            job.last_error = ''
+            job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'last_error', 'finished_at'])
+
+    def retry_delay(self, attempts):
+        return timedelta(seconds=min(self.options['backoff'] * 2 ** (attempts - 1), self.options['max_backoff']))
+
+    def cancel(self, job, exc):
+        job.status = DocumentJob.Status.FAILED
+        job.last_error = str(exc)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'last_error', 'finished_at'])
+        self.stderr.write(f'Заявление {job.application_id}: {job.last_error}')
+
+    def schedule_retry(self, job, exc):
+        job.last_error = f'{type(exc).__name__}: {exc}'
+        if job.attempts >= self.options['max_attempts']:
+            job.status = DocumentJob.Status.FAILED
+        # next_attempt_at уже отодвинут при взятии задания
+        job.save(update_fields=['status', 'last_error'])
+        self.stderr.write(f'Заявление {job.application_id}: {job.last_error}')
@@ -0,0 +1,75 @@
+"""
+Права на файлы из MEDIA_ROOT.
+
+Сотрудники видят все файлы, студент — только файлы своих заявлений
+(документы, подпись, вложения из fields_data) и их миниатюры. Шаблоны полей
+из публичного каталога и аватары доступны всем авторизованным.
+"""
+import posixpath
+
+from django.conf import settings
+from django.db.models import Q
+
+from users.models import User
+
+from .models import Application, ApplicationFieldValue
+
+PUBLIC_PREFIXES = ('applications/templates/',)
+AUTHENTICATED_PREFIXES = ('avatars/',)
+THUMBNAILS_PREFIX = 'thumbs/'
+# Подписи видят сотрудники и сам владелец, студент — ещё и подписи на своих заявлениях
+SIGNATURES_PREFIX = 'signatures/'
+# Имя содержит хеш содержимого: файл по этому пути никогда не меняется
+IMMUTABLE_PREFIXES = ('uploads/', SIGNATURES_PREFIX)
+
+APPLICATION_FILE_FIELDS = (
+    'example_document', 'sent_document', 'ready_document', 'student_signature', 'prorector_signature',
+)
+
+
+def original_name(name):
+    """Для миниатюры thumbs/<размер>/<оригинал>.<формат> — путь оригинала."""
+    if name.startswith(THUMBNAILS_PREFIX):
+        _, _, rest = name[len(THUMBNAILS_PREFIX):].partition('/')
+        return rest.rpartition('.')[0]
+    return name
+
+
+def clean_name(name):
+    """
+    Имя в хранилище без «.» и повторных «/» или None для абсолютного пути и
+    пути с «..»: иначе разрешённый префикс можно обойти через prefix/../.
+    """
+    if not name or name.startswith('/') or '\x00' in name or '..' in name.split('/'):
+        return None
+    name = posixpath.normpath(name)
+    return None if name in ('.', '') else name
+
+
+def can_access_media(policy, name):
+    name = clean_name(name)
+    if name is None:
+        return False
+    name = original_name(name)
+    if name.startswith(PUBLIC_PREFIXES):
+        return True
+    if policy.role is None:
+        return False
+    if policy.is_staff or name.startswith(AUTHENTICATED_PREFIXES):
+        return True
+    if name.startswith(SIGNATURES_PREFIX) and User.objects.filter(pk=policy.user_id, signature=name).exists():
+        return True
+
+    own_files = Q()
+    for field in APPLICATION_FILE_FIELDS:
+        own_files |= Q(**{field: name})
+    if Application.objects.filter(own_files, student_id=policy.user_id).exists():
+        return True
+    # Вложения хранятся в fields_data ссылкой MEDIA_URL + путь
+    return ApplicationFieldValue.objects.filter(
+        application__student_id=policy.user_id, value=settings.MEDIA_URL + name
+    ).exists()
+
+
+def is_immutable(name):
+    return name.startswith(IMMUTABLE_PREFIXES)
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0010_outboxemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='status_order',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(status='in_progress', then=0), models.When(status='under_review', then=1), output_field=models.IntegerField()), output_field=models.IntegerField()),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0011_application_status_order'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['student', '-submission_date', '-id'], name='app_student_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['-submission_date', '-id'], name='app_submission_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['status', '-submission_date', '-id'], name='app_status_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(condition=models.Q(('status_order__isnull', False)), fields=['status_order', '-submission_date', '-id'], name='app_prorector_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Копия разворачивания fields_data из applications.search на момент миграции
+MAX_LENGTH = 255
+
+
+def normalize_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)[:MAX_LENGTH]
+
+
+def flatten_fields_data(data, prefix=''):
+    for key, value in data.items():
+        path = f'{prefix}{key}'[:MAX_LENGTH]
+        items = value if isinstance(value, list) else [value]
+        for item in items:
+            if isinstance(item, dict):
+                yield from flatten_fields_data(item, f'{path}.')
+            elif item is not None and not isinstance(item, list):
+                yield path, normalize_value(item)
+
+
+def index_existing_applications(apps, schema_editor):
+    Application = apps.get_model('applications', 'Application')
+    ApplicationFieldValue = apps.get_model('applications', 'ApplicationFieldValue')
+    db_alias = schema_editor.connection.alias
+
+    batch = []
+    rows = Application.objects.using(db_alias).values_list('id', 'fields_data')
+    for application_id, fields_data in rows.iterator(chunk_size=1000):
+        if isinstance(fields_data, dict):
+            batch.extend(
+                ApplicationFieldValue(application_id=application_id, key=key, value=value,
+                                      search_value=value.casefold()[:MAX_LENGTH])
+                for key, value in set(flatten_fields_data(fields_data))
+            )
+        if len(batch) >= 1000:
+            ApplicationFieldValue.objects.using(db_alias).bulk_create(batch)
+            batch = []
+    ApplicationFieldValue.objects.using(db_alias).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0012_application_queue_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationFieldValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('value', models.CharField(max_length=255)),
+                ('search_value', models.CharField(max_length=255)),
+                ('application', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='field_values', to='applications.application')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key', 'value', 'application'], name='app_field_value_idx')],
+            },
+        ),
+        migrations.RunPython(index_existing_applications, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_status_changed_at(apps, schema_editor):
+    # Точный момент смены статуса до журнала неизвестен, ближайшая оценка — последнее изменение
+    Application = apps.get_model('applications', 'Application')
+    Application.objects.using(schema_editor.connection.alias).update(status_changed_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0013_applicationfieldvalue'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='status_changed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_status_changed_at, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='ApplicationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('submitted', 'Подано'), ('status_changed', 'Изменён статус'), ('document_uploaded', 'Загружен документ')], max_length=20)),
+                ('from_status', models.CharField(blank=True, choices=[('created', 'Создано'), ('under_review', 'Проверяется'), ('in_progress', 'Отправлен на подписание'), ('completed', 'Готово'), ('rejected', 'Отклонено')], max_length=20)),
+                ('to_status', models.CharField(choices=[('created', 'Создано'), ('under_review', 'Проверяется'), ('in_progress', 'Отправлен на подписание'), ('completed', 'Готово'), ('rejected', 'Отклонено')], max_length=20)),
+                ('time_in_status', models.DurationField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('application', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='applications.application')),
+                ('application_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='applications.applicationtype')),
+                ('comment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='applications.applicationcomment')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['application', 'created_at'], name='app_event_history_idx'), models.Index(fields=['from_status', 'application_type', 'created_at'], name='app_event_latency_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:24
+
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+# Копия корзин и пересчёта из applications.statistics на момент миграции:
+# дальнейшие изменения модуля не должны менять результат старой миграции
+TURNAROUND_BUCKETS = (1, 4, 8, 24, 48, 72, 120, 168, 336, 720, None)
+
+
+def bucket_for(duration):
+    hours = duration.total_seconds() / 3600
+    for index, bound in enumerate(TURNAROUND_BUCKETS):
+        if bound is None or hours <= bound:
+            return index
+
+
+def fill_rollups(apps, schema_editor):
+    Application = apps.get_model('applications', 'Application')
+    ApplicationStatusCount = apps.get_model('applications', 'ApplicationStatusCount')
+    DailySubmissionCount = apps.get_model('applications', 'DailySubmissionCount')
+    TurnaroundBucket = apps.get_model('applications', 'TurnaroundBucket')
+    db_alias = schema_editor.connection.alias
+
+    applications = Application.objects.using(db_alias).order_by()
+    ApplicationStatusCount.objects.using(db_alias).bulk_create([
+        ApplicationStatusCount(application_type_id=type_id, status=status, count=count)
+        for type_id, status, count in applications.values_list('application_type', 'status').annotate(Count('id'))
+    ], batch_size=1000)
+    DailySubmissionCount.objects.using(db_alias).bulk_create([
+        DailySubmissionCount(day=day, application_type_id=type_id, count=count)
+        for day, type_id, count in applications.annotate(day=TruncDate('submission_date'))
+        .values_list('day', 'application_type').annotate(Count('id'))
+    ], batch_size=1000)
+
+    turnaround = Counter(
+        (type_id, bucket_for(changed_at - submitted))
+        for type_id, submitted, changed_at in applications.filter(status='completed')
+        .values_list('application_type', 'submission_date', 'status_changed_at').iterator()
+    )
+    TurnaroundBucket.objects.using(db_alias).bulk_create([
+        TurnaroundBucket(application_type_id=type_id, bucket=bucket, count=count)
+        for (type_id, bucket), count in turnaround.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0014_applicationevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationStatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('created', 'Создано'), ('under_review', 'Проверяется'), ('in_progress', 'Отправлен на подписание'), ('completed', 'Готово'), ('rejected', 'Отклонено')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('application_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='applications.applicationtype')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailySubmissionCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('application_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='applications.applicationtype')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TurnaroundBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('application_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='applications.applicationtype')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='applicationstatuscount',
+            constraint=models.UniqueConstraint(fields=('application_type', 'status'), name='unique_status_count'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailysubmissioncount',
+            constraint=models.UniqueConstraint(fields=('day', 'application_type'), name='unique_daily_submission_count'),
+        ),
+        migrations.AddConstraint(
+            model_name='turnaroundbucket',
+            constraint=models.UniqueConstraint(fields=('application_type', 'bucket'), name='unique_turnaround_bucket'),
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
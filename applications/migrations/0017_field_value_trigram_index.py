@@ -0,0 +1,32 @@
+from django.db import migrations
+
+INDEX_NAME = 'app_field_value_trgm_idx'
+
+
+def create_trigram_index(apps, schema_editor):
+    # ?search= ищет подстроку (LIKE '%...%'), её обслуживает только триграммный индекс PostgreSQL.
+    # В SQLite индекса нет, поиск просматривает таблицу ApplicationFieldValue.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON applications_applicationfieldvalue '
+        f'USING gin (search_value gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0016_document_job'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
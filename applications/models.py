@@ -1,7 +1,26 @@
+import json
+
 from django.core.validators import FileExtensionValidator
 from django.db import models
+from django.db.models import Case, When
+from django.utils import timezone
 from users.models import User
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def fields_data_fingerprint(fields_data):
+    """Хеш канонического JSON fields_data: с orjson на порядок дешевле копии данных."""
+    if orjson is not None:
+        try:
+            return hash(orjson.dumps(fields_data, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS))
+        except TypeError:
+            pass
+    return hash(json.dumps(fields_data, sort_keys=True, default=str))
+
 
 class ApplicationField(models.Model):
     FIELD_TYPES = [
@@ -82,17 +101,225 @@ class Application(models.Model):
         validators=[FileExtensionValidator(['jpg', 'png'])]
     )
 
+    prorector_signature = models.FileField(
+        upload_to='applications/signatures/',
+        blank=True, null=True,
+        validators=[FileExtensionValidator(['jpg', 'png'])]
+    )
+
     reviewer_comment = models.ForeignKey(ApplicationComment, related_name='reviewer_comments', on_delete=models.SET_NULL, blank=True, null=True)
     prorector_comment = models.ForeignKey(ApplicationComment, related_name='prorector_comments', on_delete=models.SET_NULL, blank=True, null=True)
 
     submission_date = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Проекция журнала ApplicationEvent: с какого момента заявление в текущем статусе
+    status_changed_at = models.DateTimeField(default=timezone.now)
 
     fields_data = models.JSONField(default=dict)
 
+    # Приоритет в очереди проректора: сначала отправленные на подписание, затем проверяемые.
+    # Хранится в БД, чтобы сортировка и keyset-курсор шли по индексу, а не по выражению.
+    status_order = models.GeneratedField(
+        expression=Case(
+            When(status=Status.IN_PROGRESS, then=0),
+            When(status=Status.UNDER_REVIEW, then=1),
+            output_field=models.IntegerField(),
+        ),
+        output_field=models.IntegerField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            # Список студента: student = ? ORDER BY -submission_date, -id
+            models.Index(fields=['student', '-submission_date', '-id'], name='app_student_queue_idx'),
+            # Общий список для сотрудников
+            models.Index(fields=['-submission_date', '-id'], name='app_submission_idx'),
+            # Очередь проверяющего: status IN (...) ORDER BY -submission_date, -id
+            models.Index(fields=['status', '-submission_date', '-id'], name='app_status_queue_idx'),
+            # Очередь проректора: только заявления с приоритетом
+            models.Index(
+                fields=['status_order', '-submission_date', '-id'],
+                name='app_prorector_queue_idx',
+                condition=models.Q(status_order__isnull=False),
+            ),
+        ]
+
     def __str__(self):
         return f'{self.application_type.name} - {self.student.username}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Отпечаток fields_data: индекс ApplicationFieldValue не пересобирается, если данные формы не менялись
+        if 'fields_data' in instance.__dict__:
+            instance._indexed_fingerprint = fields_data_fingerprint(instance.fields_data)
+        return instance
+
     def get_required_fields(self):
-        """Возвращает список обязательных полей для текущего типа заявления"""
-        return self.application_type.fields.filter(is_required=True)
+        """
+        Возвращает список обязательных полей (ApplicationField) для текущего типа заявления.
+        Поля берутся из схемы типа в кеше applications.schemas, без запроса к БД; экземпляры
+        общие для процесса, изменять их нельзя.
+        """
+        from .schemas import get_schema
+
+        return list(get_schema(self.application_type_id).required_fields)
+
+
+class OutboxEmail(models.Model):
+    """Письмо, ожидающее отправки воркером send_outbox_emails."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Ожидает отправки'
+        SENT = 'sent', 'Отправлено'
+        FAILED = 'failed', 'Ошибка отправки'
+
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject} ({self.status})'
+
+
+class DocumentJob(models.Model):
+    """
+    Наложение подписей на sent_document заявления. Выполняет воркер
+    stamp_documents, по готовности заявление переходит в статус «Готово».
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Ожидает'
+        DONE = 'done', 'Готово'
+        FAILED = 'failed', 'Ошибка'
+
+    # Статусы, из которых подписанное заявление переходит в «Готово»
+    SIGNABLE_STATUSES = (Application.Status.UNDER_REVIEW, Application.Status.IN_PROGRESS)
+
+    application = models.ForeignKey(Application, on_delete=models.CASCADE, related_name='document_jobs')
+    # Кто подписал: от его имени пишется переход статуса
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='docjob_status_next_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.application_id}: {self.status}'
+
+
+class ApplicationFieldValue(models.Model):
+    """
+    Пары ключ/значение из Application.fields_data в виде строк таблицы, чтобы
+    фильтровать заявления по данным формы через индекс. Синхронизируется
+    сигналом при сохранении заявления (applications.search).
+    """
+    application = models.ForeignKey(Application, on_delete=models.CASCADE, related_name='field_values')
+    key = models.CharField(max_length=255)
+    value = models.CharField(max_length=255)
+    # value.casefold() для поиска подстроки без учёта регистра: LIKE в SQLite не сворачивает кириллицу
+    search_value = models.CharField(max_length=255)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['key', 'value', 'application'], name='app_field_value_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.key}={self.value}'
+
+
+class ApplicationEvent(models.Model):
+    """
+    Запись журнала заявления, только добавляется. Текущее состояние хранится в
+    Application.status и status_changed_at, журнал пишет applications.workflow.
+    """
+
+    class Kind(models.TextChoices):
+        SUBMITTED = 'submitted', 'Подано'
+        STATUS_CHANGED = 'status_changed', 'Изменён статус'
+        DOCUMENT_UPLOADED = 'document_uploaded', 'Загружен документ'
+
+    application = models.ForeignKey(Application, on_delete=models.CASCADE, related_name='events')
+    # Копия application.application_type_id: статистика по типам без join с заявлениями
+    application_type = models.ForeignKey(ApplicationType, on_delete=models.CASCADE, related_name='+')
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    # Заполнен только для смены статуса
+    from_status = models.CharField(max_length=20, choices=Application.Status.choices, blank=True)
+    to_status = models.CharField(max_length=20, choices=Application.Status.choices)
+    # Сколько заявление пробыло в from_status до этого события
+    time_in_status = models.DurationField(blank=True, null=True)
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
+    comment = models.ForeignKey(ApplicationComment, on_delete=models.SET_NULL, blank=True, null=True,
+                                related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # История заявления по порядку
+            models.Index(fields=['application', 'created_at'], name='app_event_history_idx'),
+            # Время в статусе по типам: from_status = ? GROUP BY application_type
+            models.Index(fields=['from_status', 'application_type', 'created_at'], name='app_event_latency_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.application_id}: {self.from_status or "—"} → {self.to_status}'
+
+
+class ApplicationStatusCount(models.Model):
+    """Число заявлений типа в статусе. Обновляется в applications.statistics, сверяется reconcile_statistics."""
+    application_type = models.ForeignKey(ApplicationType, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=20, choices=Application.Status.choices)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['application_type', 'status'], name='unique_status_count'),
+        ]
+
+
+class DailySubmissionCount(models.Model):
+    """Число поданных за день заявлений типа (день по TIME_ZONE)."""
+    day = models.DateField()
+    application_type = models.ForeignKey(ApplicationType, on_delete=models.CASCADE, related_name='+')
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'application_type'], name='unique_daily_submission_count'),
+        ]
+
+
+class TurnaroundBucket(models.Model):
+    """Гистограмма времени от подачи до готовности: bucket — индекс в statistics.TURNAROUND_BUCKETS."""
+    application_type = models.ForeignKey(ApplicationType, on_delete=models.CASCADE, related_name='+')
+    bucket = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['application_type', 'bucket'], name='unique_turnaround_bucket'),
+        ]
@@ -0,0 +1,91 @@
+"""
+Проверка fields_data заявления по полям его типа.
+
+Для каждого типа поля ApplicationField один раз собираются в схему: имя
+(ключ в fields_data), обязательность и, для файловых полей, допустимые
+расширения. Схемы живут в памяти процесса под версией каталога
+(applications.catalog), которую сбрасывают сигналы при изменении типов и
+полей, поэтому проверка заявления — один проход по полям без запросов к БД.
+Ключи, которых нет среди полей типа, не проверяются.
+"""
+import os
+from urllib.parse import urlparse
+
+from . import catalog
+from .models import ApplicationType
+
+FILE_EXTENSIONS = {
+    'image': ('jpg', 'jpeg', 'png', 'webp'),
+    'document': ('pdf', 'doc', 'docx'),
+    'signature': ('jpg', 'jpeg', 'png'),
+}
+
+_schemas = {}
+_version = None
+
+
+class FieldRule:
+    __slots__ = ('name', 'field_type', 'required', 'extensions')
+
+    def __init__(self, name, field_type, required):
+        self.name = name
+        self.field_type = field_type
+        self.required = required
+        # None — текстовое поле
+        self.extensions = FILE_EXTENSIONS.get(field_type)
+
+    def check(self, value, upload):
+        """Текст ошибки или None."""
+        if upload is None and (value in (None, [], {}) or isinstance(value, str) and not value.strip()):
+            return 'Обязательное поле.' if self.required else None
+        if self.extensions is None:
+            if upload is not None or not isinstance(value, (str, int, float)):
+                return 'Ожидается текстовое значение.'
+            return None
+        # Файл загружен в запросе или уже лежит в fields_data ссылкой
+        name = upload.name if upload is not None else value if isinstance(value, str) else ''
+        extension = os.path.splitext(urlparse(name).path)[1].lower().lstrip('.')
+        if extension not in self.extensions:
+            return f'Допустимые форматы: {", ".join(self.extensions)}.'
+        return None
+
+
+class Schema:
+    def __init__(self, application_type_id, fields):
+        self.application_type_id = application_type_id
+        self.rules = tuple(FieldRule(field.name, field.field_type, field.is_required) for field in fields)
+        # Строки ApplicationField для Application.get_required_fields
+        self.required_fields = tuple(field for field in fields if field.is_required)
+
+    def validate(self, fields_data, files=None):
+        """{имя поля: ошибка} для fields_data и загруженных файлов {имя поля: файл}."""
+        files = files or {}
+        errors = {}
+        for rule in self.rules:
+            error = rule.check(fields_data.get(rule.name), files.get(rule.name))
+            if error:
+                errors[rule.name] = error
+        return errors
+
+
+def compile_schema(application_type_id):
+    """Схема типа по его полям или None, если типа нет."""
+    application_type = ApplicationType.objects.filter(pk=application_type_id).prefetch_related('fields').first()
+    if application_type is None:
+        return None
+    return Schema(application_type.pk, sorted(application_type.fields.all(), key=lambda field: field.pk))
+
+
+def get_schema(application_type_id):
+    global _schemas, _version
+    version = catalog.get_catalog_version()
+    if version != _version:
+        _schemas, _version = {}, version
+    # Ссылка на словарь текущей версии: схема, собранная во время смены версии, в новый словарь не попадёт
+    schemas = _schemas
+    schema = schemas.get(application_type_id)
+    if schema is None:
+        schema = compile_schema(application_type_id)
+        if schema is not None:
+            schemas[application_type_id] = schema
+    return schema
@@ -0,0 +1,78 @@
+"""
+Индекс по Application.fields_data.
+
+Вложенные ключи разворачиваются через точку (address.city), списки дают по
+строке на элемент, значения приводятся к строке длиной до 255 символов.
+"""
+from .models import ApplicationFieldValue, fields_data_fingerprint
+
+MAX_LENGTH = 255
+
+
+def normalize_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)[:MAX_LENGTH]
+
+
+def flatten_fields_data(data, prefix=''):
+    for key, value in data.items():
+        path = f'{prefix}{key}'[:MAX_LENGTH]
+        items = value if isinstance(value, list) else [value]
+        for item in items:
+            if isinstance(item, dict):
+                yield from flatten_fields_data(item, f'{path}.')
+            elif item is not None and not isinstance(item, list):
+                yield path, normalize_value(item)
+
+
+def make_field_value(application_id, key, value):
+    return ApplicationFieldValue(application_id=application_id, key=key, value=value,
+                                 search_value=value.casefold()[:MAX_LENGTH])
+
+
+def sync_field_values(application, created=False):
+    """
+    Перестраивает строки индекса заявления, если fields_data изменились с
+    загрузки (Application.from_db) или прошлой синхронизации.
+    """
+    fingerprint = fields_data_fingerprint(application.fields_data)
+    if not created and getattr(application, '_indexed_fingerprint', None) == fingerprint:
+        return
+
+    fields_data = application.fields_data if isinstance(application.fields_data, dict) else {}
+    expected = set(flatten_fields_data(fields_data))
+    if not created:
+        current = set(
+            ApplicationFieldValue.objects.filter(application=application).values_list('key', 'value')
+        )
+        if expected == current:
+            application._indexed_fingerprint = fingerprint
+            return
+        ApplicationFieldValue.objects.filter(application=application).delete()
+
+    ApplicationFieldValue.objects.bulk_create([
+        make_field_value(application.pk, key, value) for key, value in expected
+    ])
+    application._indexed_fingerprint = fingerprint
+
+
+def bulk_index_field_values(rows, chunk_size=1000):
+    """
+    Добавляет строки индекса для пар (application_id, fields_data) без сигналов,
+    например после bulk_create. Возвращает количество вставленных значений.
+    """
+    total = 0
+    batch = []
+    for application_id, fields_data in rows:
+        if isinstance(fields_data, dict):
+            batch.extend(
+                make_field_value(application_id, key, value)
+                for key, value in set(flatten_fields_data(fields_data))
+            )
+        if len(batch) >= chunk_size:
+            ApplicationFieldValue.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    ApplicationFieldValue.objects.bulk_create(batch)
+    return total + len(batch)
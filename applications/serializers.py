@@ -1,5 +1,11 @@
+from django.db import transaction
 from rest_framework import serializers
-from .models import Application, ApplicationType, ApplicationField, ApplicationComment
+from config.fieldsets import SparseFieldsetsMixin, ValuesSerializer
+from config.thumbnails import media_name_from_url, thumbnail_urls
+from . import workflow
+from .attachments import store_attachment
+from .schemas import get_schema
+from .models import Application, ApplicationType, ApplicationField, ApplicationComment, ApplicationEvent
 from django.core.files.storage import default_storage
 
 
@@ -23,7 +29,7 @@ class ApplicationTypeLiteSerializer(serializers.ModelSerializer):
         fields = ['id', 'name']
 
 
-class ApplicationSerializer(serializers.ModelSerializer):
+class ApplicationSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     student = serializers.ReadOnlyField(source='student.username')
     application_type = ApplicationTypeLiteSerializer(read_only=True)
     fields_data = serializers.JSONField()  # Поле для хранения произвольных данных пользователя
@@ -32,23 +38,80 @@ class ApplicationSerializer(serializers.ModelSerializer):
     sent_document = serializers.FileField(required=False, allow_null=True)
     ready_document = serializers.FileField(required=False, allow_null=True)
     student_signature = serializers.FileField(required=False, allow_null=True)
+    # Загружается при подписании (ProrectorApplicationActionViewSet.sign)
+    prorector_signature = serializers.FileField(read_only=True)
 
     status = serializers.ChoiceField(choices=Application.Status.choices, required=False)
 
+    student_signature_thumbnails = serializers.SerializerMethodField()
+    attachment_thumbnails = serializers.SerializerMethodField()
+
+    MODEL_FILE_FIELDS = ('example_document', 'sent_document', 'ready_document', 'student_signature')
+
     class Meta:
         model = Application
         fields = [
             'id', 'student', 'application_type', 'status', 'fields_data',
-            'example_document', 'sent_document', 'ready_document', 'student_signature',
+            'example_document', 'sent_document', 'ready_document', 'student_signature', 'prorector_signature',
+            'student_signature_thumbnails', 'attachment_thumbnails',
             'reviewer_comment', 'prorector_comment',
             'submission_date', 'updated_at'
         ]
         read_only_fields = ['student', 'application_type', 'submission_date', 'updated_at']
 
+    def get_student_signature_thumbnails(self, obj):
+        return thumbnail_urls(obj.student_signature.name, self.context.get('request'))
+
+    def get_attachment_thumbnails(self, obj):
+        """Миниатюры изображений, загруженных в поля формы: {поле: {размер: URL}}."""
+        if not isinstance(obj.fields_data, dict):
+            return {}
+        request = self.context.get('request')
+        thumbnails = {}
+        for field_name, value in obj.fields_data.items():
+            urls = thumbnail_urls(media_name_from_url(value), request)
+            if urls:
+                thumbnails[field_name] = urls
+        return thumbnails
+
+    def validate(self, attrs):
+        """fields_data и загруженные файлы проверяются по схеме типа заявления из applications.schemas."""
+        if self.instance is None:
+            application_type_id = self.initial_data.get('application_type')
+            request = self.context.get('request')
+            files = {
+                name: file for name, file in (request.FILES.items() if request is not None else ())
+                if name not in self.MODEL_FILE_FIELDS
+            }
+        elif 'fields_data' in attrs:
+            application_type_id = self.instance.application_type_id
+            files = {}
+        else:
+            return attrs
+
+        try:
+            schema = get_schema(int(application_type_id))
+        except (TypeError, ValueError):
+            schema = None
+        if schema is None:
+            raise serializers.ValidationError({'application_type': 'Неизвестный тип заявления.'})
+
+        fields_data = attrs.get('fields_data', {})
+        if not isinstance(fields_data, dict):
+            raise serializers.ValidationError({'fields_data': 'Ожидается объект.'})
+        errors = schema.validate(fields_data, files)
+        if errors:
+            raise serializers.ValidationError({'fields_data': errors})
+        return attrs
+
     def update(self, instance, validated_data):
         # Проверка прав доступа может быть реализована здесь или во вьюхе
-        instance.status = validated_data.get('status', instance.status)
-        instance.save()
+        new_status = validated_data.get('status', instance.status)
+        with transaction.atomic():
+            if new_status != instance.status:
+                workflow.transition(instance, new_status, self.context['request'].user)
+            else:
+                instance.save()
         return instance
 
     def create(self, validated_data):
@@ -56,28 +119,86 @@ class ApplicationSerializer(serializers.ModelSerializer):
         application_type = validated_data.get('application_type')
         fields_data = validated_data.get('fields_data', {})
 
-        # Сохраняем заявление
-        application = Application.objects.create(
-            student=user,
-            application_type=application_type,
-            fields_data=fields_data,
-            sent_document=validated_data.get('sent_document'),
-            student_signature=validated_data.get('student_signature'),
-            status=Application.Status.UNDER_REVIEW
-        )
-
-        # Сохраняем загруженные файлы и добавляем их ссылки в fields_data
+        # Сохраняем загруженные файлы и добавляем их ссылки в fields_data.
+        # Файлы полей модели сохранит сама модель, одинаковые вложения хранятся один раз.
         files = self.context['request'].FILES
         file_links = {}
 
         for field_name, file in files.items():
-            file_path = default_storage.save(f'uploads/{file.name}', file)  # Сохраняем файл
-            file_url = default_storage.url(file_path)  # Получаем URL сохраненного файла
-            file_links[field_name] = file_url  # Добавляем ссылку в словарь
-
-        # Обновляем fields_data с ссылками на файлы
-        application.fields_data.update(file_links)
-        application.save()
+            if field_name in self.MODEL_FILE_FIELDS:
+                continue
+            file_path = store_attachment(file)
+            file_links[field_name] = default_storage.url(file_path)
+
+        # Сохраняем заявление вместе с первой записью журнала
+        with transaction.atomic():
+            application = Application.objects.create(
+                student=user,
+                application_type=application_type,
+                fields_data={**fields_data, **file_links},
+                sent_document=validated_data.get('sent_document'),
+                student_signature=validated_data.get('student_signature'),
+                status=Application.Status.UNDER_REVIEW
+            )
+            workflow.record_submission(application, user)
 
         return application
 
+
+class ApplicationListSerializer(ValuesSerializer):
+    """Плоская строка списка заявлений (?flat=1): без вложенных объектов, вложений и миниатюр."""
+    datetime_field = serializers.DateTimeField()
+    status_labels = dict(Application.Status.choices)
+
+    class Meta:
+        columns = {
+            'id': 'id',
+            'student': 'student__username',
+            'application_type': 'application_type_id',
+            'application_type_name': 'application_type__name',
+            'status': 'status',
+            'status_display': 'status',
+            'ready_document': 'ready_document',
+            'submission_date': 'submission_date',
+            'updated_at': 'updated_at',
+        }
+
+    def format_status_display(self, value):
+        return self.status_labels.get(value, value)
+
+    def format_ready_document(self, value):
+        return self.media_url(value)
+
+    def format_submission_date(self, value):
+        return self.datetime_field.to_representation(value)
+
+    def format_updated_at(self, value):
+        return self.datetime_field.to_representation(value)
+
+
+class ApplicationEventSerializer(serializers.ModelSerializer):
+    actor = serializers.CharField(source='actor.username', default=None)
+    comment = serializers.CharField(source='comment.text', default=None)
+
+    class Meta:
+        model = ApplicationEvent
+        fields = ['kind', 'from_status', 'to_status', 'time_in_status', 'actor', 'comment', 'created_at']
+
+
+class BulkActionSerializer(serializers.Serializer):
+    ACTIONS = {
+        'accept': Application.Status.IN_PROGRESS,
+        'reject': Application.Status.REJECTED,
+        'complete': Application.Status.COMPLETED,
+    }
+
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=1000)
+    action = serializers.ChoiceField(choices=list(ACTIONS))
+    comment = serializers.CharField(required=False, allow_blank=False)
+
+    def validate(self, attrs):
+        if attrs['action'] == 'reject' and not attrs.get('comment'):
+            raise serializers.ValidationError({'comment': 'Комментарий обязателен для отклонения заявления.'})
+        # Убираем повторы, сохраняя порядок
+        attrs['ids'] = list(dict.fromkeys(attrs['ids']))
+        return attrs
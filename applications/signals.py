@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from config.thumbnails import is_image, media_name_from_url, schedule_thumbnails
+from . import catalog
+from .models import Application, ApplicationField, ApplicationType
+from .search import sync_field_values
+
+
+@receiver(post_save, sender=ApplicationType)
+@receiver(post_delete, sender=ApplicationType)
+@receiver(post_save, sender=ApplicationField)
+@receiver(post_delete, sender=ApplicationField)
+@receiver(m2m_changed, sender=ApplicationType.fields.through)
+def invalidate_catalog(**kwargs):
+    # После коммита, чтобы параллельный запрос не закешировал старые данные под новой версией
+    transaction.on_commit(catalog.bump_catalog_version)
+
+
+@receiver(post_save, sender=Application)
+def index_fields_data(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and 'fields_data' not in update_fields):
+        return
+    sync_field_values(instance, created)
+
+
+@receiver(post_save, sender=Application)
+def generate_application_thumbnails(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and not {'student_signature', 'fields_data'} & set(update_fields)):
+        return
+    names = [instance.student_signature.name]
+    if isinstance(instance.fields_data, dict):
+        names += [media_name_from_url(value) for value in instance.fields_data.values()]
+    for name in filter(is_image, names):
+        transaction.on_commit(lambda name=name: schedule_thumbnails(name))
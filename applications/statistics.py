@@ -0,0 +1,171 @@
+"""
+Сводные таблицы для дашборда: заявления по типам и статусам, подачи по дням и
+гистограмма времени до готовности.
+
+Таблицы меняются приращениями вместе с событиями журнала (apply_events
+вызывается из workflow в той же транзакции), поэтому дашборд читает
+несколько десятков строк при любом числе заявлений. Массовые вставки в
+обход workflow (seed_benchmark_data) и возможный дрейф исправляет
+reconcile_statistics, пересчитывая всё по заявлениям.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    Application, ApplicationEvent, ApplicationStatusCount, DailySubmissionCount, TurnaroundBucket,
+)
+
+# Верхние границы корзин времени до готовности в часах, последняя корзина открытая
+TURNAROUND_BUCKETS = (1, 4, 8, 24, 48, 72, 120, 168, 336, 720, None)
+
+
+def bucket_for(duration):
+    hours = duration / timedelta(hours=1)
+    for index, bound in enumerate(TURNAROUND_BUCKETS):
+        if bound is None or hours <= bound:
+            return index
+
+
+def median_hours(histogram):
+    """Медиана по гистограмме {индекс корзины: число} с линейной интерполяцией внутри корзины."""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    half = total / 2
+    seen = 0
+    for index, upper in enumerate(TURNAROUND_BUCKETS):
+        count = histogram.get(index, 0)
+        if count and seen + count >= half:
+            lower = TURNAROUND_BUCKETS[index - 1] if index else 0
+            if upper is None:
+                return lower
+            return round(lower + (upper - lower) * (half - seen) / count, 1)
+        seen += count
+
+
+def apply_events(events):
+    """Учитывает в сводных таблицах сохраняемые события журнала."""
+    statuses = Counter()
+    daily = Counter()
+    turnaround = Counter()
+    for event in events:
+        type_id = event.application_type_id
+        submitted = event.application.submission_date
+        if event.kind == ApplicationEvent.Kind.SUBMITTED:
+            statuses[type_id, event.to_status] += 1
+            daily[timezone.localdate(submitted), type_id] += 1
+        elif event.kind == ApplicationEvent.Kind.STATUS_CHANGED:
+            statuses[type_id, event.from_status] -= 1
+            statuses[type_id, event.to_status] += 1
+            if event.from_status == Application.Status.COMPLETED:
+                completed_at = event.created_at - event.time_in_status
+                turnaround[type_id, bucket_for(completed_at - submitted)] -= 1
+            if event.to_status == Application.Status.COMPLETED:
+                turnaround[type_id, bucket_for(event.created_at - submitted)] += 1
+
+    increment(ApplicationStatusCount, ('application_type_id', 'status'), statuses)
+    increment(DailySubmissionCount, ('day', 'application_type_id'), daily)
+    increment(TurnaroundBucket, ('application_type_id', 'bucket'), turnaround)
+
+
+def increment(model, key_fields, deltas):
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    # Недостающие строки создаём с нулём, затем атомарно прибавляем: параллельные транзакции не теряют приращений
+    model.objects.bulk_create([model(**dict(zip(key_fields, key))) for key in deltas], ignore_conflicts=True)
+    for key, delta in deltas.items():
+        model.objects.filter(**dict(zip(key_fields, key))).update(count=F('count') + delta)
+
+
+def compute_rollups():
+    """Пересчёт сводных таблиц с нуля по заявлениям."""
+    applications = Application.objects.order_by()
+    statuses = Counter({
+        (type_id, status): count
+        for type_id, status, count in applications.values_list('application_type', 'status').annotate(Count('id'))
+    })
+    daily = Counter({
+        (day, type_id): count
+        for day, type_id, count in applications.annotate(day=TruncDate('submission_date'))
+        .values_list('day', 'application_type').annotate(Count('id'))
+    })
+    turnaround = Counter(
+        (type_id, bucket_for(changed_at - submitted))
+        for type_id, submitted, changed_at in applications.filter(status=Application.Status.COMPLETED)
+        .values_list('application_type', 'submission_date', 'status_changed_at').iterator()
+    )
+    return statuses, daily, turnaround
+
+
+def write_rollups(rollups):
+    statuses, daily, turnaround = rollups
+    for model in (ApplicationStatusCount, DailySubmissionCount, TurnaroundBucket):
+        model.objects.all().delete()
+    ApplicationStatusCount.objects.bulk_create([
+        ApplicationStatusCount(application_type_id=type_id, status=status, count=count)
+        for (type_id, status), count in statuses.items()
+    ], batch_size=1000)
+    DailySubmissionCount.objects.bulk_create([
+        DailySubmissionCount(day=day, application_type_id=type_id, count=count)
+        for (day, type_id), count in daily.items()
+    ], batch_size=1000)
+    TurnaroundBucket.objects.bulk_create([
+        TurnaroundBucket(application_type_id=type_id, bucket=bucket, count=count)
+        for (type_id, bucket), count in turnaround.items()
+    ], batch_size=1000)
+
+
+def read_rollups():
+    """Текущее содержимое сводных таблиц в том же виде, что и compute_rollups."""
+    return (
+        Counter({(row.application_type_id, row.status): row.count
+                 for row in ApplicationStatusCount.objects.exclude(count=0)}),
+        Counter({(row.day, row.application_type_id): row.count
+                 for row in DailySubmissionCount.objects.exclude(count=0)}),
+        Counter({(row.application_type_id, row.bucket): row.count
+                 for row in TurnaroundBucket.objects.exclude(count=0)}),
+    )
+
+
+def dashboard(days=30, application_type=None):
+    """Данные эндпоинта статистики: по статусам и типам, подачи по дням, время до готовности."""
+    status_rows = ApplicationStatusCount.objects.filter(count__gt=0)
+    daily_rows = DailySubmissionCount.objects.filter(day__gt=timezone.localdate() - timedelta(days=days))
+    turnaround_rows = TurnaroundBucket.objects.filter(count__gt=0)
+    if application_type is not None:
+        status_rows = status_rows.filter(application_type=application_type)
+        daily_rows = daily_rows.filter(application_type=application_type)
+        turnaround_rows = turnaround_rows.filter(application_type=application_type)
+
+    by_type = status_rows.values('application_type', 'application_type__name', 'status', 'count') \
+        .order_by('application_type', 'status')
+    totals = Counter()
+    for row in by_type:
+        totals[row['status']] += row['count']
+
+    histogram = dict(turnaround_rows.values_list('bucket').annotate(total=Sum('count')).order_by())
+
+    return {
+        'by_status': dict(totals),
+        'by_type': [
+            {'application_type': row['application_type'], 'name': row['application_type__name'],
+             'status': row['status'], 'count': row['count']}
+            for row in by_type
+        ],
+        'daily_submissions': [
+            {'day': row['day'], 'count': row['total']}
+            for row in daily_rows.values('day').annotate(total=Sum('count')).order_by('day')
+        ],
+        'turnaround': {
+            'median_hours': median_hours(histogram),
+            'histogram': [
+                {'le_hours': bound, 'count': histogram.get(index, 0)}
+                for index, bound in enumerate(TURNAROUND_BUCKETS)
+            ],
+        },
+    }
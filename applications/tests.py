@@ -1,3 +1,900 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import json
+import os
+import tempfile
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from config.db_router import REPLICA_DB_ALIAS, ReplicaRouter, read_from_replica
+from config.renderers import FastJSONParser, FastJSONRenderer
+from config.testing import QueryBudgetMixin
+from config.thumbnails import generate_thumbnails, media_name_from_url, thumbnail_path, thumbnail_urls
+from users.models import User
+from users.signatures import store_signature
+from . import documents, export, workflow
+from .management.commands import explain_queues, stamp_documents
+from .schemas import get_schema
+from .models import Application, ApplicationField, ApplicationType, DocumentJob, OutboxEmail
+
+
+class OutboxEmailTests(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user('student', 'student@example.com', 'pass')
+        self.reviewer = User.objects.create_user('reviewer', 'reviewer@example.com', 'pass',
+                                                 role=User.Roles.REVIEWER)
+        self.application = Application.objects.create(
+            student=self.student,
+            application_type=ApplicationType.objects.create(name='Справка'),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.reviewer)
+
+    def test_action_queues_email_instead_of_sending(self):
+        response = self.client.post(f'/api/applications/list/{self.application.pk}/accept/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboxEmail.objects.get().recipient, 'student@example.com')
+
+        call_command('send_outbox_emails', stdout=mock.MagicMock())
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(OutboxEmail.objects.get().status, OutboxEmail.Status.SENT)
+
+    def test_failed_send_is_retried_with_backoff(self):
+        email = OutboxEmail.objects.create(recipient='student@example.com', subject='s', body='b')
+
+        with mock.patch('django.core.mail.EmailMessage.send', side_effect=OSError('smtp down')):
+            call_command('send_outbox_emails', '--max-attempts=2', stdout=mock.MagicMock())
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.Status.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, email.created_at)
+        self.assertIn('smtp down', email.last_error)
+
+    def test_send_happens_after_the_batch_is_claimed(self):
+        email = OutboxEmail.objects.create(recipient='student@example.com', subject='s', body='b')
+        savepoints = len(connection.savepoint_ids)
+
+        def send(message):
+            # Транзакция выборки уже закрыта, а письмо взято в аренду
+            self.assertEqual(len(connection.savepoint_ids), savepoints)
+            leased = OutboxEmail.objects.get(pk=email.pk)
+            self.assertEqual(leased.attempts, 1)
+            self.assertGreater(leased.next_attempt_at, timezone.now())
+            return 1
+
+        with mock.patch('django.core.mail.EmailMessage.send', autospec=True, side_effect=send):
+            call_command('send_outbox_emails', stdout=mock.MagicMock())
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.Status.SENT)
+
+
+class ApplicationListQueryBudgetTests(QueryBudgetMixin, TestCase):
+    # Бюджет запросов на один запрос к списку, независимо от числа заявлений
+    QUERY_BUDGETS = {
+        '/api/applications/list/': 1,
+        '/api/applications/list-for-prorector/': 1,
+        '/api/applications/list-for-preview/': 1,
+        '/api/applications/list-for-prorector/?flat=1': 1,
+    }
+
+    def setUp(self):
+        self.prorector = User.objects.create_user('prorector', password='pass', role=User.Roles.PRORECTOR)
+        self.client = APIClient()
+        self.client.force_authenticate(self.prorector)
+
+    def populate(self, size):
+        for index in range(Application.objects.count(), size):
+            student = User.objects.create_user(f'student{User.objects.count()}')
+            application_type = ApplicationType.objects.create(name=f'Тип {index}')
+            Application.objects.create(student=student, application_type=application_type,
+                                       status=Application.Status.UNDER_REVIEW)
+
+    def test_list_endpoints_have_constant_query_count(self):
+        for url, budget in self.QUERY_BUDGETS.items():
+            with self.subTest(url=url):
+                Application.objects.all().delete()
+                self.assertConstantQueries(budget, url, self.populate)
+
+
+@override_settings(METRICS_SAMPLE_RATE=1.0, METRICS_TOKEN='secret')
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.reviewer = User.objects.create_user('reviewer', role=User.Roles.REVIEWER)
+        student = User.objects.create_user('student')
+        Application.objects.create(student=student, application_type=ApplicationType.objects.create(name='Справка'))
+        self.client = APIClient()
+
+    def scrape(self):
+        response = self.client.get('/internal/metrics/', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        return {
+            name: float(value)
+            for name, _, value in (line.rpartition(' ') for line in response.content.decode().splitlines())
+            if not name.startswith('#')
+        }
+
+    def test_sampled_requests_are_counted_per_route(self):
+        labels = '{route="application-list",method="GET"}'
+        before = self.scrape()
+        self.client.force_authenticate(self.reviewer)
+        response = self.client.get('/api/applications/list/')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        after = self.scrape()
+
+        def delta(name):
+            return after[name] - before.get(name, 0)
+
+        self.assertEqual(delta(f'http_request_duration_seconds_count{labels}'), 1)
+        self.assertEqual(delta('http_requests_total{route="application-list",method="GET",status="2xx"}'), 1)
+        self.assertGreater(delta(f'http_db_queries_total{labels}'), 0)
+        self.assertGreater(delta(f'http_serializer_duration_seconds_total{labels}'), 0)
+        self.assertEqual(delta(f'http_response_size_bytes_total{labels}'), len(response.content))
+
+    def test_metrics_require_token(self):
+        # Тестовый клиент приходит с 127.0.0.1, как запросы за обратным прокси
+        self.assertEqual(self.client.get('/internal/metrics/').status_code, 404)
+        self.assertEqual(self.client.get('/internal/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 404)
+        with override_settings(METRICS_TOKEN=None):
+            self.assertEqual(self.client.get('/internal/metrics/', HTTP_AUTHORIZATION='Bearer None').status_code, 404)
+        self.scrape()
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.prorector = User.objects.create_user('prorector', role=User.Roles.PRORECTOR)
+        student = User.objects.create_user('student')
+        application_type = ApplicationType.objects.create(name='Справка')
+        for index in range(7):
+            Application.objects.create(
+                student=student, application_type=application_type,
+                status=Application.Status.IN_PROGRESS if index % 3 else Application.Status.UNDER_REVIEW,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.prorector)
+
+    def test_pages_follow_prorector_ordering_in_both_directions(self):
+        url = '/api/applications/list-for-prorector/?page_size=3&with_count=1'
+        first = self.client.get(url).json()
+        self.assertEqual(first['count'], 7)
+        self.assertIsNone(first['previous'])
+
+        ids = [row['id'] for row in first['results']]
+        page = first
+        while page['next']:
+            page = self.client.get(page['next']).json()
+            ids.extend(row['id'] for row in page['results'])
+
+        expected = self.prorector_order()
+        self.assertEqual(ids, expected)
+
+        previous = self.client.get(page['previous']).json()
+        self.assertEqual([row['id'] for row in previous['results']], expected[3:6])
+
+    def test_flat_rows_paginate_with_the_same_cursor(self):
+        page = self.client.get('/api/applications/list-for-prorector/?flat=1&page_size=3&omit=ready_document').json()
+        self.assertEqual(set(page['results'][0]), {
+            'id', 'student', 'application_type', 'application_type_name', 'status', 'status_display',
+            'submission_date', 'updated_at',
+        })
+        ids = [row['id'] for row in page['results']]
+        while page['next']:
+            page = self.client.get(page['next']).json()
+            ids.extend(row['id'] for row in page['results'])
+        self.assertEqual(ids, self.prorector_order())
+
+    def prorector_order(self):
+        return [application.pk for application in sorted(
+            Application.objects.all(),
+            key=lambda a: (a.status != Application.Status.IN_PROGRESS, -a.submission_date.timestamp(), -a.pk),
+        )]
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/applications/list-for-prorector/?cursor=garbage')
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor_is_rejected(self):
+        for position in (['x', 'y', 'z'], [1, None, 2], [[1], {}, 2], [1, '2024-01-01T00:00:00Z', 'z']):
+            payload = json.dumps({'p': position, 'r': 0}).encode()
+            cursor = base64.urlsafe_b64encode(payload).decode().rstrip('=')
+            response = self.client.get(f'/api/applications/list-for-prorector/?cursor={cursor}')
+            self.assertEqual(response.status_code, 404, position)
+
+
+class ExplainQueuesTests(TestCase):
+    def test_queue_plans_use_indexes(self):
+        output = io.StringIO()
+        call_command('explain_queues', stdout=output)
+
+        for queue in ('list', 'list-for-prorector', 'list-for-preview'):
+            for page in ('первая страница', 'по курсору'):
+                self.assertIn(f'[OK] {queue} (admin, {page})', output.getvalue())
+        self.assertNotIn('[FAIL]', output.getvalue())
+        self.assertIn('Все очереди используют индексы.', output.getvalue())
+
+    def test_scan_and_temp_sort_are_reported(self):
+        plan = 'SCAN applications_application\nUSE TEMP B-TREE FOR ORDER BY'
+        issues = explain_queues.Command.find_issues(plan, 'applications_application')
+        if connection.vendor == 'sqlite':
+            self.assertEqual(issues, ['полное сканирование таблицы', 'сортировка во временном B-дереве'])
+
+
+class ReplicaRouterTests(TestCase):
+    """Реплика — второй файл SQLite с теми же миграциями, данные в него пишутся напрямую."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Алиас появляется только здесь: раннер тестов не создаёт и не проверяет эту базу
+        cls.databases = {'default', REPLICA_DB_ALIAS}
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        connections.databases[REPLICA_DB_ALIAS] = {
+            **connections['default'].settings_dict,
+            'NAME': os.path.join(directory.name, 'replica.sqlite3'),
+            'TEST': {'NAME': None, 'MIRROR': None},
+        }
+        cls.addClassCleanup(cls.remove_replica)
+        call_command('migrate', database=REPLICA_DB_ALIAS, verbosity=0)
+        super().setUpClass()
+
+    @staticmethod
+    def remove_replica():
+        connections[REPLICA_DB_ALIAS].close()
+        del connections[REPLICA_DB_ALIAS]
+        del connections.databases[REPLICA_DB_ALIAS]
+
+    def test_list_reads_from_replica_and_writes_go_to_default(self):
+        prorector = User.objects.create_user('prorector', role=User.Roles.PRORECTOR)
+        application_type = ApplicationType.objects.using(REPLICA_DB_ALIAS).create(name='Только на реплике')
+        Application.objects.using(REPLICA_DB_ALIAS).create(
+            student=User.objects.using(REPLICA_DB_ALIAS).create(username='student'),
+            application_type=application_type, status=Application.Status.IN_PROGRESS,
+        )
+
+        client = APIClient()
+        client.force_authenticate(prorector)
+        rows = client.get('/api/applications/list-for-prorector/?flat=1').json()['results']
+        self.assertEqual([row['application_type_name'] for row in rows], ['Только на реплике'])
+        self.assertFalse(Application.objects.exists())
+
+        with read_from_replica():
+            self.assertEqual(ReplicaRouter().db_for_read(Application), REPLICA_DB_ALIAS)
+            self.assertEqual(ReplicaRouter().db_for_write(Application), 'default')
+
+class SparseFieldsetsTests(TestCase):
+    def setUp(self):
+        student = User.objects.create_user('student')
+        Application.objects.create(student=student, application_type=ApplicationType.objects.create(name='Справка'),
+                                   fields_data={'group': 'ИВТ-21'})
+        self.client = APIClient()
+        self.client.force_authenticate(student)
+
+    def test_fields_and_omit(self):
+        [row] = self.client.get('/api/applications/list/?fields=id,status,student,unknown').json()['results']
+        self.assertEqual(set(row), {'id', 'status', 'student'})
+
+        [row] = self.client.get('/api/applications/list/?omit=fields_data,attachment_thumbnails').json()['results']
+        self.assertNotIn('fields_data', row)
+        self.assertEqual(row['application_type']['name'], 'Справка')
+
+
+class FieldSchemaTests(TestCase):
+    def setUp(self):
+        # Версия каталога сбрасывается on_commit, а TestCase его не вызывает: схемы не должны пережить тест
+        cache.clear()
+        self.addCleanup(cache.clear)
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+        self.application_type = ApplicationType.objects.create(name='Справка')
+        self.group = ApplicationField.objects.create(name='Группа', field_type='text')
+        self.scan = ApplicationField.objects.create(name='Скан', field_type='document')
+        self.application_type.fields.add(
+            self.group,
+            self.scan,
+            ApplicationField.objects.create(name='Фото', field_type='image', is_required=False),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('student'))
+
+    def submit(self, fields_data, **files):
+        return self.client.post('/api/applications/list/', {
+            'application_type': self.application_type.pk, 'fields_data': json.dumps(fields_data), **files,
+        }, format='multipart')
+
+    def test_submission_is_checked_against_type_fields(self):
+        response = self.submit({'Группа': ' '}, Скан=SimpleUploadedFile('scan.png', b'png'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()['fields_data']), {'Группа', 'Скан'})
+
+        response = self.submit({'Группа': 'ИВТ-21'}, Скан=SimpleUploadedFile('scan.pdf', b'%PDF-1.4'))
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(Application.objects.get().fields_data['Скан'].endswith('.pdf'))
+
+    def test_schema_is_cached_until_fields_change(self):
+        schema = get_schema(self.application_type.pk)
+        with self.assertNumQueries(0):
+            self.assertIs(get_schema(self.application_type.pk), schema)
+            application = Application(application_type=self.application_type)
+            self.assertEqual(application.get_required_fields(), [self.group, self.scan])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.scan.is_required = False
+            self.scan.save()
+        self.assertEqual(application.get_required_fields(), [self.group])
+
+
+class JSONRendererTests(TestCase):
+    def test_fast_renderer_matches_drf_output(self):
+        data = {
+            'status': 'Готово', 'amount': Decimal('1.50'), 'id': uuid.uuid4(), 'took': timedelta(hours=1),
+            'at': timezone.now().replace(microsecond=0), 'day': timezone.localdate(), 2: None,
+        }
+        self.assertEqual(json.loads(FastJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+        self.assertIn('Готово'.encode(), FastJSONRenderer().render(data))
+
+        self.assertEqual(FastJSONParser().parse(io.BytesIO('{"a": "б"}'.encode())), {'a': 'б'})
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"a": NaN}'))
+
+
+class ApplicationCatalogTests(TestCase):
+    url = '/api/applications/types/'
+
+    def setUp(self):
+        cache.clear()
+        self.application_type = ApplicationType.objects.create(name='Справка')
+        self.application_type.fields.add(ApplicationField.objects.create(name='Группа', field_type='text'))
+
+    def test_revalidation_returns_304_without_queries(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()[0]['fields'][0]['name'], 'Группа')
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(cached.json(), response.json())
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_admin_changes_invalidate_catalog(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.application_type.fields.add(ApplicationField.objects.create(name='Курс', field_type='text'))
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()[0]['fields']), 2)
+
+
+class AttachmentStoreTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.media_root = media_root.name
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+
+        student = User.objects.create_user('student')
+        self.application_type = ApplicationType.objects.create(name='Справка')
+        self.client = APIClient()
+        self.client.force_authenticate(student)
+
+    def submit(self, content):
+        return self.client.post('/api/applications/list/', {
+            'application_type': self.application_type.pk,
+            'fields_data': '{}',
+            'photo': SimpleUploadedFile('photo.JPG', content),
+        }, format='multipart')
+
+    def test_identical_uploads_are_stored_once(self):
+        first = self.submit(b'same bytes')
+        second = self.submit(b'same bytes')
+        self.assertEqual(first.status_code, 201, first.content)
+
+        first_url = Application.objects.get(pk=first.json()['id']).fields_data['photo']
+        second_url = Application.objects.get(pk=second.json()['id']).fields_data['photo']
+        self.assertEqual(first_url, second_url)
+        self.assertTrue(first_url.endswith('.jpg'))
+
+        stored = [name for _, _, names in os.walk(os.path.join(self.media_root, 'uploads')) for name in names]
+        self.assertEqual(len(stored), 1)
+
+    def test_image_attachment_gets_thumbnails(self):
+        image = io.BytesIO()
+        Image.new('RGB', (1200, 800), 'white').save(image, 'PNG')
+        # Генерируем синхронно, фоновый пул в тесте не нужен
+        with mock.patch('config.thumbnails.schedule_thumbnails') as schedule:
+            response = self.submit(image.getvalue())
+        self.assertEqual(response.status_code, 201, response.content)
+        name = media_name_from_url(Application.objects.get(pk=response.json()['id']).fields_data['photo'])
+        self.assertIsNone(response.json()['attachment_thumbnails'].get('photo'))
+        schedule.assert_called_with(name)
+
+        self.assertEqual(generate_thumbnails(name), 2)
+        self.assertEqual(generate_thumbnails(name), 0)
+
+        urls = thumbnail_urls(name)
+        self.assertEqual(set(urls), {'small', 'medium'})
+        with default_storage.open(thumbnail_path(name, 'small')) as thumbnail:
+            self.assertEqual(max(Image.open(thumbnail).size), 128)
+
+
+class ProtectedMediaTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+        self.owner = User.objects.create_user('owner')
+        self.application = Application.objects.create(
+            student=self.owner,
+            application_type=ApplicationType.objects.create(name='Справка'),
+            ready_document=SimpleUploadedFile('ready.pdf', b'0123456789'),
+        )
+        self.url = self.application.ready_document.url
+        self.client = APIClient()
+
+    def test_only_owner_and_staff_can_download(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+        self.client.force_authenticate(User.objects.create_user('stranger'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        for user in (self.owner, User.objects.create_user('reviewer', role=User.Roles.REVIEWER)):
+            self.client.force_authenticate(user)
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+
+    def test_range_and_etag(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=20-').status_code, 416)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_path_traversal_is_rejected(self):
+        default_storage.save('applications/templates/blank.pdf', io.BytesIO(b'blank'))
+        secret = self.application.ready_document.name
+        for path in (
+            f'applications/templates/../../{secret}',
+            f'applications/templates/%2e%2e/%2e%2e/{secret}',
+            f'applications/templates/./../../{secret}',
+        ):
+            self.assertEqual(self.client.get('/media/' + path).status_code, 404, path)
+        self.assertEqual(self.client.get('/media/applications/templates/./blank.pdf').status_code, 200)
+
+        self.client.force_authenticate(User.objects.create_user('stranger'))
+        for path in (f'avatars/../{secret}', f'avatars/%2e%2e/{secret}', f'thumbs/small/../../{secret}.webp'):
+            self.assertEqual(self.client.get('/media/' + path).status_code, 404, path)
+
+    def test_directory_is_not_served(self):
+        self.client.force_authenticate(User.objects.create_user('reviewer', role=User.Roles.REVIEWER))
+        directory = os.path.dirname(self.application.ready_document.name)
+        for path in (directory, directory + '/', 'applications'):
+            self.assertEqual(self.client.get('/media/' + path).status_code, 404, path)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='nginx')
+    def test_nginx_serves_the_file(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.application.ready_document.name)
+        self.assertEqual(response.content, b'')
+
+
+class DocumentStampingTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+        page = io.BytesIO()
+        Image.new('RGB', (595, 842), 'white').save(page, 'PDF')
+        signature = io.BytesIO()
+        Image.new('RGBA', (300, 100), (0, 0, 128, 255)).save(signature, 'PNG')
+
+        self.prorector = User.objects.create_user(
+            'prorector', role=User.Roles.PRORECTOR,
+            signature=store_signature(signature.getvalue()),
+        )
+        self.application = Application.objects.create(
+            student=User.objects.create_user('student', email='student@example.com'),
+            application_type=ApplicationType.objects.create(name='Справка'),
+            status=Application.Status.IN_PROGRESS,
+            sent_document=SimpleUploadedFile('sent.pdf', page.getvalue()),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.prorector)
+        self.url = f'/api/applications/list-for-prorector/{self.application.pk}/sign/'
+
+    @skipIf(documents.PdfWriter is None, 'pypdf не установлен')
+    def test_sign_only_enqueues_stamping(self):
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 202)
+        self.application.refresh_from_db()
+        self.assertEqual(self.application.status, Application.Status.IN_PROGRESS)
+        self.assertTrue(self.application.prorector_signature.name.endswith('.png'))
+        self.assertEqual(self.application.document_jobs.get().status, DocumentJob.Status.PENDING)
+
+        self.assertEqual(self.client.post(self.url).status_code, 400)
+
+    def test_worker_stamps_document_and_completes(self):
+        self.client.post(self.url)
+        if documents.PdfWriter is None:
+            with self.assertRaises(CommandError):
+                call_command('stamp_documents', stdout=io.StringIO())
+            return
+
+        call_command('stamp_documents', workers=1, stdout=io.StringIO())
+        self.application.refresh_from_db()
+        self.assertEqual(self.application.status, Application.Status.COMPLETED)
+        self.assertTrue(self.application.ready_document.read().startswith(b'%PDF'))
+        self.assertEqual(self.application.document_jobs.get().status, DocumentJob.Status.DONE)
+        self.assertTrue(OutboxEmail.objects.filter(recipient='student@example.com').exists())
+
+    @skipIf(documents.PdfWriter is None, 'pypdf не установлен')
+    def test_worker_skips_application_rejected_meanwhile(self):
+        self.client.post(self.url)
+        read_inputs = stamp_documents.Command.read_inputs
+
+        def reject_meanwhile(command, application):
+            # Заявление отклоняют, пока документ обрабатывается в пуле
+            Application.objects.filter(pk=application.pk).update(status=Application.Status.REJECTED)
+            return read_inputs(command, application)
+
+        with mock.patch.object(stamp_documents.Command, 'read_inputs', reject_meanwhile):
+            call_command('stamp_documents', workers=1, stdout=io.StringIO(), stderr=io.StringIO())
+        self.application.refresh_from_db()
+        self.assertEqual(self.application.status, Application.Status.REJECTED)
+        self.assertFalse(self.application.ready_document)
+        self.assertEqual(self.application.document_jobs.get().status, DocumentJob.Status.FAILED)
+
+    def test_doc_is_signed_without_stamping(self):
+        self.application.sent_document = SimpleUploadedFile('sent.docx', b'docx')
+        self.application.save()
+
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.application.refresh_from_db()
+        self.assertEqual(self.application.status, Application.Status.COMPLETED)
+        self.assertTrue(self.application.prorector_signature)
+        self.assertFalse(self.application.document_jobs.exists())
+        self.assertEqual(self.client.post(self.url).status_code, 400)
+
+
+class RolePolicyTests(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user('student', password='pass')
+        self.application = Application.objects.create(
+            student=self.student, application_type=ApplicationType.objects.create(name='Справка'),
+        )
+        self.client = APIClient()
+
+    def login(self, user):
+        response = self.client.post('/api/users/token/', {'username': user.username, 'password': 'pass'})
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["access"]}')
+
+    def test_student_cannot_use_staff_actions(self):
+        self.login(self.student)
+        self.assertEqual(self.client.get('/api/applications/list/').status_code, 200)
+        self.assertEqual(self.client.post(f'/api/applications/list/{self.application.pk}/accept/').status_code, 403)
+        self.assertEqual(self.client.get('/api/applications/list-for-prorector/').status_code, 403)
+        self.assertEqual(self.client.get('/api/users/list/').status_code, 403)
+
+    def test_role_comes_from_token_claims(self):
+        reviewer = User.objects.create_user('reviewer', password='pass', role=User.Roles.REVIEWER)
+        self.login(reviewer)
+        with self.assertNumQueries(1):
+            # Только сама страница: роль из токена, пользователь не загружается
+            self.assertEqual(self.client.get('/api/applications/list-for-preview/').status_code, 200)
+        self.assertEqual(self.client.delete(f'/api/applications/list/{self.application.pk}/').status_code, 403)
+        response = self.client.post('/api/applications/list/bulk/', {
+            'ids': [self.application.pk], 'action': 'complete',
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+    def test_demoted_staff_loses_rights_after_refresh(self):
+        reviewer = User.objects.create_user('reviewer', password='pass', role=User.Roles.REVIEWER)
+        tokens = self.client.post('/api/users/token/', {'username': 'reviewer', 'password': 'pass'}).json()
+        reviewer.role = User.Roles.STUDENT
+        reviewer.save()
+
+        # Старый access-токен ещё несёт роль reviewer, но запись проверяется по роли из БД
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        self.assertEqual(self.client.post(f'/api/applications/list/{self.application.pk}/reject/', {
+            'comment': 'Нет',
+        }, format='json').status_code, 403)
+
+        # Refresh выпускает роль заново, а не копирует её из старого токена
+        access = self.client.post('/api/users/token/refresh/', {'refresh': tokens['refresh']}).json()['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(self.client.get('/api/applications/list-for-preview/').status_code, 403)
+        self.assertEqual(self.client.get('/api/applications/list/').json()['results'], [])
+
+class ApplicationEventTests(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user('student')
+        self.reviewer = User.objects.create_user('reviewer', role=User.Roles.REVIEWER)
+        self.application_type = ApplicationType.objects.create(name='Справка')
+        self.client = APIClient()
+
+    def test_actions_append_events_and_keep_comments(self):
+        self.client.force_authenticate(self.student)
+        pk = self.client.post('/api/applications/list/', {
+            'application_type': self.application_type.pk, 'fields_data': '{}',
+        }, format='multipart').json()['id']
+
+        self.client.force_authenticate(self.reviewer)
+        self.client.post(f'/api/applications/list/{pk}/reject/', {'comment': 'Нет подписи'}, format='json')
+        self.client.post(f'/api/applications/list/{pk}/change_status/', {'status': 'under_review'}, format='json')
+        self.client.post(f'/api/applications/list/bulk/', {
+            'ids': [pk], 'action': 'reject', 'comment': 'Снова нет подписи',
+        }, format='json')
+
+        history = self.client.get(f'/api/applications/list/{pk}/history/').json()
+        self.assertEqual([event['to_status'] for event in history],
+                         ['under_review', 'rejected', 'under_review', 'rejected'])
+        self.assertEqual([event['comment'] for event in history if event['comment']],
+                         ['Нет подписи', 'Снова нет подписи'])
+        self.assertEqual(history[1]['actor'], 'reviewer')
+
+        application = Application.objects.get(pk=pk)
+        self.assertEqual(application.status, Application.Status.REJECTED)
+        self.assertEqual(application.status_changed_at, application.events.latest('created_at').created_at)
+
+    def test_time_in_status_per_type(self):
+        application = Application.objects.create(student=self.student, application_type=self.application_type)
+        application.status_changed_at -= timedelta(hours=2)
+        workflow.transition(application, Application.Status.IN_PROGRESS, self.reviewer)
+
+        [row] = workflow.time_in_status(Application.Status.UNDER_REVIEW)
+        self.assertEqual(row['application_type'], self.application_type.pk)
+        self.assertEqual(row['count'], 1)
+        self.assertAlmostEqual(row['average'].total_seconds(), 7200, delta=5)
+
+
+    def test_admin_cannot_edit_the_log(self):
+        application = Application.objects.create(student=self.student, application_type=self.application_type)
+        workflow.transition(application, Application.Status.IN_PROGRESS, self.reviewer)
+        event = application.events.latest('created_at')
+
+        self.client.force_login(User.objects.create_superuser('admin', password='pass'))
+        self.assertEqual(self.client.get('/admin/applications/applicationevent/').status_code, 200)
+        self.assertEqual(self.client.get('/admin/applications/applicationevent/add/').status_code, 403)
+        self.assertEqual(self.client.post(f'/admin/applications/applicationevent/{event.pk}/change/', {
+            'to_status': 'completed',
+        }).status_code, 403)
+        self.assertEqual(self.client.post(f'/admin/applications/applicationevent/{event.pk}/delete/', {
+            'post': 'yes',
+        }).status_code, 403)
+        event.refresh_from_db()
+        self.assertEqual(event.to_status, Application.Status.IN_PROGRESS)
+
+class StatisticsTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+        self.prorector = User.objects.create_user('prorector', role=User.Roles.PRORECTOR)
+        self.application_type = ApplicationType.objects.create(name='Справка')
+        self.client = APIClient()
+
+    def test_rollups_follow_transitions_and_match_reconciliation(self):
+        student = User.objects.create_user('student')
+        self.client.force_authenticate(student)
+        ids = [
+            self.client.post('/api/applications/list/', {
+                'application_type': self.application_type.pk, 'fields_data': '{}',
+            }, format='multipart').json()['id']
+            for _ in range(3)
+        ]
+        self.client.force_authenticate(self.prorector)
+        self.client.post('/api/applications/list/bulk/', {'ids': ids[:2], 'action': 'accept'}, format='json')
+        self.client.post(f'/api/applications/list/{ids[0]}/complete/', {
+            'ready_document': SimpleUploadedFile('ready.pdf', b'%PDF-1.4'),
+        }, format='multipart')
+
+        with self.assertNumQueries(3):
+            stats = self.client.get('/api/applications/statistics/').json()
+        self.assertEqual(stats['by_status'], {'under_review': 1, 'in_progress': 1, 'completed': 1})
+        self.assertEqual(stats['daily_submissions'][-1]['count'], 3)
+        self.assertEqual(stats['turnaround']['histogram'][0]['count'], 1)
+
+        output = io.StringIO()
+        call_command('reconcile_statistics', '--dry-run', stdout=output)
+        self.assertEqual(output.getvalue().count('расхождений 0'), 3, output.getvalue())
+
+    def test_students_have_no_access(self):
+        self.client.force_authenticate(User.objects.create_user('student'))
+        self.assertEqual(self.client.get('/api/applications/statistics/').status_code, 403)
+
+
+class SeedBenchmarkDataTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+    def seed(self):
+        call_command('seed_benchmark_data', students=3, types=2, fields=2, applications=5, attachments=2,
+                     stdout=io.StringIO())
+
+    def test_rerun_does_not_duplicate_data(self):
+        self.seed()
+        self.seed()
+        self.assertEqual(ApplicationType.objects.filter(name__startswith='bench_').count(), 2)
+        self.assertEqual(ApplicationField.objects.filter(name__startswith='bench_').count(), 4)
+        self.assertEqual(Application.objects.filter(student__username__startswith='bench_').count(), 5)
+        self.assertEqual(sum(len(files) for _, _, files in os.walk(default_storage.path('uploads'))), 2)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        student = User.objects.create_user('student')
+        application_type = ApplicationType.objects.create(name='Справка')
+        for course in (2, 3):
+            Application.objects.create(student=student, application_type=application_type,
+                                       fields_data={'group': 'ИВТ-21', 'course': course, 'address': {'city': 'Казань'}})
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', role=User.Roles.ADMIN))
+
+    def test_csv_flattens_fields_data_and_applies_filters(self):
+        response = self.client.get('/api/applications/list/export/?field.course=3')
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['field.course'], '3')
+        self.assertEqual(rows[0]['field.address.city'], 'Казань')
+        self.assertEqual(rows[0]['student'], 'student')
+
+    def test_list_values_keep_header_and_cells_aligned(self):
+        Application.objects.all().delete()
+        Application.objects.create(student=User.objects.get(username='student'),
+                                   application_type=ApplicationType.objects.get(),
+                                   fields_data={'children': [{'name': 'Аня'}, {'name': 'Боря'}], 'tags': ['a', 'b']})
+        response = self.client.get('/api/applications/list/export/')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+
+        self.assertEqual([column for column in rows[0] if column.startswith('field.')], ['field.children', 'field.tags'])
+        self.assertEqual(rows[0]['field.children'], "{'name': 'Аня'}; {'name': 'Боря'}")
+        self.assertEqual(rows[0]['field.tags'], 'a; b')
+
+    def test_xlsx_requires_openpyxl(self):
+        response = self.client.get('/api/applications/list/export/?export_format=xlsx')
+        if export.Workbook is None:
+            self.assertEqual(response.status_code, 501)
+        else:
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(b''.join(response.streaming_content).startswith(b'PK'))
+
+
+class BulkActionTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.reviewer = User.objects.create_user('reviewer', role=User.Roles.REVIEWER)
+        self.application_type = ApplicationType.objects.create(name='Справка')
+        self.client = APIClient()
+        self.client.force_authenticate(self.reviewer)
+
+    def create_applications(self, count):
+        return [
+            Application.objects.create(student=User.objects.create_user(f'student{User.objects.count()}'),
+                                       application_type=self.application_type).pk
+            for _ in range(count)
+        ]
+
+    def test_bulk_reject_reports_per_item_results(self):
+        ids = self.create_applications(2)
+        response = self.client.post('/api/applications/list/bulk/', {
+            'ids': ids + [0], 'action': 'reject', 'comment': 'Нет подписи',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 2)
+        self.assertEqual([item['ok'] for item in response.json()['results']], [True, True, False])
+        for application in Application.objects.filter(pk__in=ids):
+            self.assertEqual(application.status, Application.Status.REJECTED)
+            self.assertEqual(application.reviewer_comment.text, 'Нет подписи')
+        self.assertEqual(OutboxEmail.objects.count(), 2)
+
+    def test_illegal_transitions_are_skipped(self):
+        pending, done = self.create_applications(2)
+        Application.objects.filter(pk=done).update(status=Application.Status.COMPLETED)
+        response = self.client.post('/api/applications/list/bulk/', {
+            'ids': [pending, done], 'action': 'accept',
+        }, format='json').json()
+
+        self.assertEqual((response['updated'], response['skipped']), (1, [done]))
+        self.assertEqual(Application.objects.get(pk=done).status, Application.Status.COMPLETED)
+        self.assertEqual(Application.objects.get(pk=pending).status, Application.Status.IN_PROGRESS)
+        self.assertEqual(self.client.post(f'/api/applications/list/{done}/accept/').status_code, 400)
+        self.assertEqual(Application.objects.get(pk=done).events.count(), 0)
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        # Сводные таблицы статистики добавляют по запросу на пару (тип, статус), а не на заявление
+        for size in (1, 30):
+            ids = self.create_applications(size)
+            self.assertQueryBudget(9, '/api/applications/list/bulk/', method='post',
+                                   data={'ids': ids, 'action': 'accept'}, format='json')
+
+
+class ApplicationFilterTests(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user('student')
+        self.application_type = ApplicationType.objects.create(name='Справка')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', role=User.Roles.ADMIN))
+
+    def create(self, fields_data, **kwargs):
+        return Application.objects.create(student=self.student, application_type=self.application_type,
+                                          fields_data=fields_data, **kwargs)
+
+    def ids(self, query):
+        response = self.client.get(f'/api/applications/list/?{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return {row['id'] for row in response.json()['results']}
+
+    def test_filters_by_fields_data_values(self):
+        first = self.create({'group': 'ИВТ-21', 'address': {'city': 'Грозный'}})
+        second = self.create({'group': 'ИВТ-22', 'course': 2})
+
+        self.assertEqual(self.ids('field.group=ИВТ-21'), {first.pk})
+        self.assertEqual(self.ids('field.address.city=Грозный'), {first.pk})
+        self.assertEqual(self.ids('field.course=2&field.group=ИВТ-22'), {second.pk})
+        self.assertEqual(self.ids('search=ивт'), {first.pk, second.pk})
+
+        second.fields_data['group'] = 'ИВТ-21'
+        second.save()
+        self.assertEqual(self.ids('field.group=ИВТ-21'), {first.pk, second.pk})
+
+    def test_index_is_rebuilt_only_when_fields_data_change(self):
+        application = Application.objects.get(pk=self.create({'group': 'ИВТ-21'}).pk)
+
+        def index_queries():
+            with CaptureQueriesContext(connection) as context:
+                application.save()
+            return [query for query in context.captured_queries if 'applicationfieldvalue' in query['sql']]
+
+        application.status = Application.Status.IN_PROGRESS
+        self.assertEqual(index_queries(), [])
+
+        application.fields_data['group'] = 'ИВТ-22'
+        self.assertTrue(index_queries())
+        self.assertEqual(self.ids('field.group=ИВТ-22'), {application.pk})
+        self.assertEqual(index_queries(), [])
+
+    def test_filters_by_status_and_date(self):
+        rejected = self.create({}, status=Application.Status.REJECTED)
+        self.create({})
+
+        self.assertEqual(self.ids('status=rejected'), {rejected.pk})
+        self.assertEqual(self.ids('submitted_before=2000-01-01'), set())
+        self.assertEqual(self.client.get('/api/applications/list/?submitted_after=вчера').status_code, 400)
@@ -1,29 +1,27 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path
 from .views import ApplicationViewSet, ProrectorApplicationListViewSet, ApplicationTypeViewSet, \
-    ProrectorApplicationActionViewSet, ReviewApplicationListViewSet
+    ProrectorApplicationActionViewSet, ReviewApplicationListViewSet, StatisticsView
 
 # Регистрация стандартных ViewSet-ов в маршрутизаторе
 router = DefaultRouter()
-router.register(r'list', ApplicationViewSet)
-router.register(r'list-for-prorector', ProrectorApplicationListViewSet)
-router.register(r'list-for-preview', ReviewApplicationListViewSet)
+router.register(r'list', ApplicationViewSet, basename='application')
+router.register(r'list-for-prorector', ProrectorApplicationListViewSet, basename='application-prorector')
+router.register(r'list-for-preview', ReviewApplicationListViewSet, basename='application-review')
 router.register(r'types', ApplicationTypeViewSet, basename='application-types')
 
-# # Добавление маршрутов для действий 'sign' и 'reject'
-# prorector_application_action = ProrectorApplicationActionViewSet.as_view({
-#     'patch': 'sign'
-# })
-# prorector_application_reject = ProrectorApplicationActionViewSet.as_view({
-#     'patch': 'reject'
-# })
+# Действия проректора над заявлением
+prorector_application_sign = ProrectorApplicationActionViewSet.as_view({
+    'post': 'sign'
+})
+prorector_application_reject = ProrectorApplicationActionViewSet.as_view({
+    'post': 'reject'
+})
 
 urlpatterns = [
-    # # Пример маршрута для подписания заявления
-    # path('list/<int:pk>/sign/', prorector_application_action, name='application-sign'),
-    #
-    # # Пример маршрута для отклонения заявления
-    # path('list/<int:pk>/reject/', prorector_application_reject, name='application-reject'),
+    path('statistics/', StatisticsView.as_view(), name='application-statistics'),
+    path('list-for-prorector/<int:pk>/sign/', prorector_application_sign, name='application-sign'),
+    path('list-for-prorector/<int:pk>/reject/', prorector_application_reject, name='application-reject'),
 ]
 
 # Добавляем маршруты из router
@@ -1,41 +1,97 @@
+from django.db import transaction
+from django.http import FileResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date
 from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-
+from rest_framework.parsers import MultiPartParser, FormParser
+
+from config.db_router import ReplicaReadMixin
+from config.fieldsets import FlatListMixin
+from config.metrics import InstrumentedViewMixin
+from config.pagination import KeysetCursorPagination
+from config.renderers import FastJSONParser
+from config.sendfile import serve_file
 from users.models import User
-from utils import send_status_change_email
-from .models import ApplicationType, Application, ApplicationComment
-from .serializers import ApplicationTypeSerializer, ApplicationSerializer
+from users.policies import RolePermission, get_policy
+from users.signatures import signature_from_value
+from utils import make_status_change_email, queue_status_change_email
+from . import catalog, statistics, workflow
+from .documents import can_stamp
+from .export import FORMATS as EXPORT_FORMATS, ExportUnavailable, export_xlsx, field_columns, iter_csv, \
+    iter_frames
+from .filters import ApplicationFilterBackend
+from .media import can_access_media, clean_name, is_immutable
+from .models import ApplicationType, Application, ApplicationComment, ApplicationEvent, DocumentJob, OutboxEmail
+from .serializers import ApplicationTypeSerializer, ApplicationSerializer, ApplicationListSerializer, \
+    BulkActionSerializer, ApplicationEventSerializer
 
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotAuthenticated, NotFound, PermissionDenied, ValidationError
+from rest_framework.views import APIView
 
 
 class ApplicationTypeViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = ApplicationType.objects.all()
+    """
+    Публичный каталог типов заявлений. Отдаётся из кеша applications.catalog
+    с ETag/Last-Modified, повторный запрос с If-None-Match получает 304
+    без обращения к БД.
+    """
+    queryset = ApplicationType.objects.prefetch_related('fields')
     serializer_class = ApplicationTypeSerializer
     permission_classes = []
+    authentication_classes = []
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, lambda version: catalog.get_catalog(request, version))
+
+    def retrieve(self, request, *args, **kwargs):
+        def get_item(version):
+            pk = str(kwargs[self.lookup_field])
+            for item in catalog.get_catalog(request, version):
+                if str(item['id']) == pk:
+                    return item
+            raise NotFound()
+
+        return self.conditional_response(request, get_item)
+
+    def conditional_response(self, request, get_data):
+        version = catalog.get_catalog_version()
+        etag = f'"{version}"'
+        last_modified = version // 10 ** 9
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = Response(get_data(version))
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
 
-class ApplicationViewSet(viewsets.ModelViewSet):
+
+class ApplicationViewSet(InstrumentedViewMixin, FlatListMixin, viewsets.ModelViewSet):
     queryset = Application.objects.all()
     serializer_class = ApplicationSerializer
-    permission_classes = [IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser, JSONParser]
+    flat_serializer_class = ApplicationListSerializer
+    permission_classes = [RolePermission]
+    policy = 'applications'
+    parser_classes = [MultiPartParser, FormParser, FastJSONParser]
+    pagination_class = KeysetCursorPagination
+    cursor_ordering = ('-submission_date', '-id')
+    filter_backends = [ApplicationFilterBackend]
 
     def get_queryset(self):
-        """Возвращаем только те заявления, которые принадлежат текущему пользователю."""
-        user = self.request.user
-        if user.role == User.Roles.STUDENT:
-            return Application.objects.filter(student=user).order_by('-submission_date')
-
-        return Application.objects.all().order_by('-submission_date')
+        """Студент видит только свои заявления, сотрудники — все."""
+        queryset = Application.objects.select_related('student', 'application_type')
+        return get_policy(self.request).scope(queryset, 'student_id').order_by(*self.cursor_ordering)
 
 
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    @action(detail=True, methods=['post'])
     def change_status(self, request, pk=None):
         application = self.get_object()
         new_status = request.data.get('status')
@@ -43,51 +99,53 @@ class ApplicationViewSet(viewsets.ModelViewSet):
         if new_status not in dict(Application.Status.choices).keys():
             return Response({'error': 'Недопустимый статус.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        application.status = new_status
-        application.save()
+        with transaction.atomic():
+            workflow.transition(application, new_status, request.user)
 
-        send_status_change_email(application.student.email, application, new_status)
+            queue_status_change_email(application.student.email, application, new_status)
 
         serializer = self.get_serializer(application)
         return Response(serializer.data)
 
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated],
+    @action(detail=True, methods=['post'],
             parser_classes=[MultiPartParser, FormParser])
     def accept(self, request, pk=None):
         application = self.get_object()
+        if not workflow.can_transition(application, Application.Status.IN_PROGRESS):
+            return Response({'error': workflow.transition_error(application)}, status=status.HTTP_400_BAD_REQUEST)
 
-        user = request.user
+        with transaction.atomic():
+            workflow.transition(application, Application.Status.IN_PROGRESS, request.user)
 
-        application.status = Application.Status.IN_PROGRESS
-        application.save()
-
-        send_status_change_email(application.student.email, application, application.get_status_display())
+            queue_status_change_email(application.student.email, application, application.get_status_display())
 
         serializer = self.get_serializer(application)
         return Response(serializer.data)
 
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated],
-            parser_classes=[MultiPartParser, FormParser, JSONParser])
+    @action(detail=True, methods=['post'],
+            parser_classes=[MultiPartParser, FormParser, FastJSONParser])
     def reject(self, request, pk=None):
         application = self.get_object()
         user = request.user
+        if not workflow.can_transition(application, Application.Status.REJECTED):
+            return Response({'error': workflow.transition_error(application)}, status=status.HTTP_400_BAD_REQUEST)
 
         comment_text = request.data.get('comment')
         if not comment_text:
             return Response({'error': 'Комментарий обязателен для отклонения заявления.'},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        reviewer_comment = ApplicationComment.objects.create(user=user, text=comment_text)
-        application.reviewer_comment = reviewer_comment
-        application.status = Application.Status.REJECTED
-        application.save()
+        with transaction.atomic():
+            reviewer_comment = ApplicationComment.objects.create(user=user, text=comment_text)
+            application.reviewer_comment = reviewer_comment
+            workflow.transition(application, Application.Status.REJECTED, user, comment=reviewer_comment)
 
-        send_status_change_email(application.student.email, application, application.get_status_display())
+            queue_status_change_email(application.student.email, application, application.get_status_display())
 
         serializer = self.get_serializer(application)
         return Response(serializer.data)
 
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated],
+    @action(detail=True, methods=['post'],
             parser_classes=[MultiPartParser, FormParser])
     def upload_document(self, request, pk=None):
         application = self.get_object()
@@ -97,33 +155,140 @@ class ApplicationViewSet(viewsets.ModelViewSet):
         if not sent_document:
             return Response({'error': 'Файл документа обязателен.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        application.sent_document = sent_document
-        application.save()
+        with transaction.atomic():
+            application.sent_document = sent_document
+            application.save()
+            workflow.record_document(application, user)
 
-        send_status_change_email(application.student.email, application, application.get_status_display())
+            queue_status_change_email(application.student.email, application, application.get_status_display())
 
         serializer = self.get_serializer(application)
         return Response(serializer.data)
 
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated],
+    @action(detail=True, methods=['post'],
             parser_classes=[MultiPartParser, FormParser])
     def complete(self, request, pk=None):
         application = self.get_object()
         user = request.user
+        if not workflow.can_transition(application, Application.Status.COMPLETED):
+            return Response({'error': workflow.transition_error(application)}, status=status.HTTP_400_BAD_REQUEST)
 
         ready_document = request.FILES.get('ready_document')
         if not ready_document:
             return Response({'error': 'Файл документа обязателен.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        application.ready_document = ready_document
-        application.status = Application.Status.COMPLETED
-        application.save()
+        with transaction.atomic():
+            application.ready_document = ready_document
+            workflow.transition(application, Application.Status.COMPLETED, user)
 
-        send_status_change_email(application.student.email, application, application.get_status_display())
+            queue_status_change_email(application.student.email, application, application.get_status_display())
 
         serializer = self.get_serializer(application)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def history(self, request, pk=None):
+        """Журнал событий заявления от подачи до текущего статуса."""
+        application = self.get_object()
+        events = application.events.select_related('actor', 'comment').order_by('created_at', 'id')
+        return Response(ApplicationEventSerializer(events, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Выгрузка заявлений с учётом фильтров списка: ?export_format=csv (по умолчанию,
+        отдаётся потоком) или ?export_format=xlsx. fields_data разворачиваются в колонки.
+        """
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({'export_format': f'Допустимые значения: {", ".join(EXPORT_FORMATS)}.'})
+
+        queryset = self.filter_queryset(self.get_queryset())
+        filename = f'applications-{timezone.localdate():%Y-%m-%d}.{export_format}'
+        if export_format == 'xlsx':
+            try:
+                file = export_xlsx(queryset)
+            except ExportUnavailable as error:
+                return Response({'error': str(error)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+            return FileResponse(file, as_attachment=True, filename=filename)
+
+        columns = field_columns(queryset)
+        response = StreamingHttpResponse(iter_csv(iter_frames(queryset, columns), columns),
+                                         content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+        return response
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_action(self, request):
+        """
+        Массовое принятие, отклонение или завершение заявлений одной транзакцией.
+        Ожидает {"ids": [...], "action": "accept" | "reject" | "complete", "comment": "..."}
+        и возвращает результат по каждому заявлению; заявления в статусе, из которого
+        действие недоступно (workflow.SOURCE_STATUSES), пропускаются и перечислены в skipped.
+        """
+        serializer = BulkActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        action_name = serializer.validated_data['action']
+        policy = get_policy(request)
+        if not policy.allows(self.policy, action_name):
+            raise PermissionDenied()
+        new_status = BulkActionSerializer.ACTIONS[action_name]
+        comment_field = 'prorector_comment' if policy.role == User.Roles.PRORECTOR else 'reviewer_comment'
+
+        results = []
+        with transaction.atomic():
+            applications = self.get_queryset().select_for_update(of=('self',)).in_bulk(ids)
+
+            updated = []
+            skipped = []
+            for pk in ids:
+                application = applications.get(pk)
+                if application is None:
+                    results.append({'id': pk, 'ok': False, 'error': 'Заявление не найдено.'})
+                elif not workflow.can_transition(application, new_status):
+                    skipped.append(pk)
+                    results.append({'id': pk, 'ok': False, 'error': workflow.transition_error(application)})
+                elif action_name == 'complete' and not application.ready_document:
+                    results.append({'id': pk, 'ok': False, 'error': 'Файл документа обязателен.'})
+                else:
+                    updated.append(application)
+                    results.append({'id': pk, 'ok': True})
+
+            now = timezone.now()
+            fields = ['status', 'status_changed_at', 'updated_at']
+            comments = [None] * len(updated)
+            if action_name == 'reject':
+                comments = ApplicationComment.objects.bulk_create([
+                    ApplicationComment(user=request.user, text=serializer.validated_data['comment'])
+                    for _ in updated
+                ])
+                for application, comment in zip(updated, comments):
+                    setattr(application, comment_field, comment)
+                fields.append(comment_field)
+
+            events = [
+                workflow.make_event(application, ApplicationEvent.Kind.STATUS_CHANGED, new_status,
+                                    request.user, comment, now=now)
+                for application, comment in zip(updated, comments)
+            ]
+            for application in updated:
+                application.updated_at = now
+            Application.objects.bulk_update(updated, fields, batch_size=500)
+            workflow.save_events(events)
+
+            OutboxEmail.objects.bulk_create([
+                make_status_change_email(application.student.email, application, application.get_status_display())
+                for application in updated
+            ], batch_size=500)
+
+        return Response({
+            'action': action_name,
+            'status': new_status,
+            'updated': len(updated),
+            'skipped': skipped,
+            'results': results,
+        })
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -136,64 +301,114 @@ class ApplicationViewSet(viewsets.ModelViewSet):
         sent_document = self.request.FILES.get('sent_document')
         application_type = ApplicationType.objects.get(id=self.request.data.get('application_type'))
 
-        files_field = dict()
-        for file in self.request.FILES:
-            files_field[file] = self.request.FILES.get(file)
-
         serializer.save(
             student=self.request.user,
             application_type=application_type,
             sent_document=sent_document,
-            files_field=files_field
         )
 
 
-from django.db.models import Case, When, IntegerField
-
-class ProrectorApplicationListViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Application.objects.filter(status__in=['in_progress', 'under_review'])
+class ProrectorApplicationListViewSet(InstrumentedViewMixin, FlatListMixin, ReplicaReadMixin,
+                                      viewsets.ReadOnlyModelViewSet):
+    # status_order заполнен ровно для статусов in_progress и under_review,
+    # а такое условие совпадает с частичным индексом app_prorector_queue_idx
+    queryset = Application.objects.filter(status_order__isnull=False).select_related('student', 'application_type')
     serializer_class = ApplicationSerializer
-    permission_classes = [IsAuthenticated]
+    flat_serializer_class = ApplicationListSerializer
+    permission_classes = [RolePermission]
+    policy = 'prorector-queue'
+    pagination_class = KeysetCursorPagination
+    cursor_ordering = ('status_order', '-submission_date', '-id')
+    filter_backends = [ApplicationFilterBackend]
 
     def get_queryset(self):
         """Возвращает все заявления, сортируя их так, чтобы сперва были те, которые в процессе."""
-        return self.queryset.annotate(
-            status_order=Case(
-                When(status='in_progress', then=0),  # Заявления в процессе будут иметь приоритет (0)
-                When(status='under_review', then=1),  # Заявления, которые на проверке, будут вторыми (1)
-                output_field=IntegerField(),
-            )
-        ).order_by('status_order', '-submission_date')
+        return self.queryset.order_by(*self.cursor_ordering)
 
 
 
-class ReviewApplicationListViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Application.objects.filter(status__in=['under_review'])
+class ReviewApplicationListViewSet(InstrumentedViewMixin, FlatListMixin, ReplicaReadMixin,
+                                   viewsets.ReadOnlyModelViewSet):
+    queryset = Application.objects.filter(status__in=['under_review']).select_related(
+        'student', 'application_type'
+    )
     serializer_class = ApplicationSerializer
-    permission_classes = [IsAuthenticated]
+    flat_serializer_class = ApplicationListSerializer
+    permission_classes = [RolePermission]
+    policy = 'review-queue'
+    pagination_class = KeysetCursorPagination
+    cursor_ordering = ('-submission_date', '-id')
+    filter_backends = [ApplicationFilterBackend]
 
     def get_queryset(self):
-        return self.queryset.order_by('-submission_date')
+        return self.queryset.order_by(*self.cursor_ordering)
+
+
+class StatisticsView(ReplicaReadMixin, APIView):
+    """
+    Дашборд: заявления по статусам и типам, подачи по дням (?days=30) и время до
+    готовности, при необходимости по одному типу (?type=1). Читает только
+    сводные таблицы applications.statistics.
+    """
+    permission_classes = [RolePermission]
+    policy = 'statistics'
+    max_days = 366
+
+    def get(self, request):
+        try:
+            days = int(request.query_params.get('days', 30))
+            application_type = request.query_params.get('type')
+            application_type = int(application_type) if application_type else None
+        except ValueError:
+            raise ValidationError({'detail': 'days и type должны быть целыми числами.'})
+        if not 1 <= days <= self.max_days:
+            raise ValidationError({'days': f'Допустимо от 1 до {self.max_days}.'})
+        return Response(statistics.dashboard(days=days, application_type=application_type))
 
 
 class ProrectorApplicationActionViewSet(viewsets.ViewSet):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [RolePermission]
+    policy = 'prorector-actions'
 
     def sign(self, request, pk=None):
-        """Подписание заявления"""
+        """
+        Подписание заявления: на PDF подписи накладываются в фоне воркером stamp_documents,
+        заявление с doc/docx подписывается сразу, без наложения.
+        """
         application = get_object_or_404(Application, pk=pk)
 
-        # Проверка наличия подписи
-        prorector_signature = request.FILES.get('prorector_signature')
-        if not prorector_signature:
+        if application.status not in DocumentJob.SIGNABLE_STATUSES or \
+                application.document_jobs.filter(status=DocumentJob.Status.PENDING).exists():
+            return Response({"error": "Заявление уже подписано, отклонено или ожидает подписания"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Подпись из запроса, иначе сохранённая в профиле
+        upload = request.FILES.get('prorector_signature')
+        if upload:
+            try:
+                prorector_signature = signature_from_value(upload)
+            except ValueError as error:
+                return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        elif request.user.signature:
+            prorector_signature = request.user.signature.name
+        else:
             return Response({"error": "Файл подписи обязателен"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Логика для подписания заявления
-        application.prorector_signature = prorector_signature
-        application.status = 'completed'
-        application.save()
+        if not can_stamp(application.sent_document.name):
+            with transaction.atomic():
+                application.prorector_signature = prorector_signature
+                workflow.transition(application, Application.Status.COMPLETED, request.user)
 
-        return Response({"message": "Заявление подписано"}, status=status.HTTP_200_OK)
+                queue_status_change_email(application.student.email, application, application.get_status_display())
+
+            return Response({"message": "Заявление подписано"}, status=status.HTTP_200_OK)
+
+        with transaction.atomic():
+            application.prorector_signature = prorector_signature
+            application.save(update_fields=['prorector_signature', 'updated_at'])
+            DocumentJob.objects.create(application=application, actor=request.user)
+
+        return Response({"message": "Заявление поставлено в очередь на подписание"}, status=status.HTTP_202_ACCEPTED)
 
     def reject(self, request, pk=None):
         """Отклонение заявления"""
@@ -205,12 +420,31 @@ class ProrectorApplicationActionViewSet(viewsets.ViewSet):
         if not prorector_comment_text:
             return Response({"error": "Комментарий обязателен для отклонения"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Создаем новый объект ApplicationComment с текстом комментария
-        prorector_comment = ApplicationComment.objects.create(user=request.user, text=prorector_comment_text)
+        with transaction.atomic():
+            # Создаем новый объект ApplicationComment с текстом комментария
+            prorector_comment = ApplicationComment.objects.create(user=request.user, text=prorector_comment_text)
 
-        # Присваиваем этот объект заявлению
-        application.prorector_comment = prorector_comment
-        application.status = 'rejected'
-        application.save()
+            # Присваиваем этот объект заявлению, прежние комментарии остаются в журнале
+            application.prorector_comment = prorector_comment
+            workflow.transition(application, Application.Status.REJECTED, request.user, comment=prorector_comment)
 
         return Response({"message": "Заявление отклонено"}, status=status.HTTP_200_OK)
+
+
+class ProtectedMediaView(APIView):
+    """Файлы из MEDIA_ROOT с проверкой прав, сама передача — через config.sendfile."""
+
+    def get(self, request, name):
+        name = clean_name(name)
+        if name is None:
+            raise NotFound()
+        policy = get_policy(request)
+        if not can_access_media(policy, name):
+            if policy.role is None:
+                raise NotAuthenticated()
+            raise NotFound()
+        try:
+            return serve_file(request, name, as_attachment='download' in request.query_params,
+                              immutable=is_immutable(name))
+        except FileNotFoundError:
+            raise NotFound()
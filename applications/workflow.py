@@ -0,0 +1,83 @@
+"""
+Переходы статусов заявления.
+
+Каждое действие над заявлением добавляет ApplicationEvent и обновляет
+проекцию (status, status_changed_at) в той же транзакции. Событие хранит,
+сколько заявление пробыло в предыдущем статусе, поэтому время в статусе
+считается агрегатом по журналу без обхода заявлений. Сводные таблицы
+дашборда (applications.statistics) обновляются при сохранении событий.
+"""
+from django.db.models import Avg, Count
+from django.utils import timezone
+
+from . import statistics
+from .models import Application, ApplicationEvent
+
+Status = Application.Status
+
+# Из каких статусов заявление можно принять, отклонить или завершить; change_status не ограничен
+SOURCE_STATUSES = {
+    Status.IN_PROGRESS: (Status.CREATED, Status.UNDER_REVIEW),
+    Status.REJECTED: (Status.CREATED, Status.UNDER_REVIEW, Status.IN_PROGRESS),
+    Status.COMPLETED: (Status.UNDER_REVIEW, Status.IN_PROGRESS),
+}
+
+
+def can_transition(application, new_status):
+    return application.status in SOURCE_STATUSES.get(new_status, ())
+
+
+def transition_error(application):
+    return f'Действие недоступно для заявления в статусе «{application.get_status_display()}».'
+
+
+def make_event(application, kind, to_status, actor=None, comment=None, now=None):
+    """Обновляет проекцию в памяти и возвращает несохранённое событие, сохраняет вызывающий."""
+    now = now or timezone.now()
+    changes_status = kind == ApplicationEvent.Kind.STATUS_CHANGED
+    event = ApplicationEvent(
+        application=application,
+        application_type_id=application.application_type_id,
+        kind=kind,
+        from_status=application.status if changes_status else '',
+        to_status=to_status,
+        actor=actor,
+        comment=comment,
+        created_at=now,
+    )
+    if changes_status:
+        event.time_in_status = now - application.status_changed_at
+        application.status = to_status
+        application.status_changed_at = now
+    return event
+
+
+def save_events(events):
+    ApplicationEvent.objects.bulk_create(events, batch_size=500)
+    statistics.apply_events(events)
+
+
+def record_submission(application, actor):
+    save_events([make_event(application, ApplicationEvent.Kind.SUBMITTED, application.status, actor,
+                            now=application.status_changed_at)])
+
+
+def record_document(application, actor):
+    save_events([make_event(application, ApplicationEvent.Kind.DOCUMENT_UPLOADED, application.status, actor)])
+
+
+def transition(application, new_status, actor=None, comment=None):
+    """Меняет статус, сохраняет заявление и пишет событие; вызывать внутри transaction.atomic()."""
+    event = make_event(application, ApplicationEvent.Kind.STATUS_CHANGED, new_status, actor, comment)
+    application.save()
+    save_events([event])
+    return event
+
+
+def time_in_status(status, since=None):
+    """Среднее время в статусе по типам заявлений: [{'application_type', 'average', 'count'}]."""
+    # from_status заполнен только у смен статуса
+    events = ApplicationEvent.objects.filter(from_status=status)
+    if since is not None:
+        events = events.filter(created_at__gte=since)
+    return events.values('application_type').annotate(average=Avg('time_in_status'), count=Count('id'))
@@ -0,0 +1,66 @@
+"""
+Маршрутизация чтения на реплику.
+
+Чтение уходит на алиас 'replica' только внутри read_from_replica(), который
+включают read-only списки через ReplicaReadMixin. Остальные запросы, включая
+чтения внутри обработчиков с записью, идут в 'default', поэтому отставание
+реплики не влияет на workflow-действия.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA_DB_ALIAS = 'replica'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+@contextmanager
+def read_from_replica():
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def replica_available():
+    """Реплика настроена и это отдельная база, а не зеркало default (как в тестах с TEST.MIRROR)."""
+    if REPLICA_DB_ALIAS not in connections.databases:
+        return False
+    replica = connections[REPLICA_DB_ALIAS].settings_dict
+    default = connections[DEFAULT_DB_ALIAS].settings_dict
+    return any(replica[key] != default[key] for key in ('NAME', 'HOST', 'PORT'))
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replica_available():
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика содержит те же данные, что и основная база
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA_DB_ALIAS:
+            # Реплика PostgreSQL получает схему репликацией, локальный файл SQLite — через migrate --database=replica
+            return connections[db].vendor == 'sqlite'
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaReadMixin:
+    """Для read-only viewset-ов: безопасные запросы читают с реплики, если она настроена."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+
+        with read_from_replica():
+            return super().dispatch(request, *args, **kwargs)
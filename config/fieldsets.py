@@ -0,0 +1,115 @@
+"""
+Разреженные наборы полей и плоские списки для API.
+
+?fields=a,b оставляет в ответе только перечисленные поля, ?omit=a,b убирает
+их; неизвестные имена игнорируются. Для ModelSerializer это делает
+SparseFieldsetsMixin (поля, которых нет в ответе, и не вычисляются).
+
+?flat=1 в списке (FlatListMixin) отдаёт строки QuerySet.values() через
+ValuesSerializer: модели не создаются, а из БД выбираются только колонки
+запрошенных полей и ключа сортировки пагинации.
+"""
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+FIELDS_QUERY_PARAM = 'fields'
+OMIT_QUERY_PARAM = 'omit'
+FLAT_QUERY_PARAM = 'flat'
+
+
+def parse_names(request, param):
+    value = request.query_params.get(param) if request is not None else None
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def select_fields(names, request):
+    """Имена из names с учётом ?fields= и ?omit=, в исходном порядке."""
+    include = parse_names(request, FIELDS_QUERY_PARAM)
+    omit = parse_names(request, OMIT_QUERY_PARAM) or set()
+    return [name for name in names if (include is None or name in include) and name not in omit]
+
+
+class SparseFieldsetsMixin:
+    """Для сериализатора ответа: ?fields= и ?omit= при чтении, вложенные сериализаторы не затрагиваются."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS or not self.is_response_root():
+            return fields
+        return {name: fields[name] for name in select_fields(fields, request)}
+
+    def is_response_root(self):
+        return self.parent is None or (self.parent is self.root and isinstance(self.parent, serializers.ListSerializer))
+
+
+class ValuesSerializer(serializers.BaseSerializer):
+    """
+    Только для чтения: строка .values() -> dict без полей DRF и моделей.
+
+    Meta.columns — {имя в ответе: путь для values()}; значение можно
+    преобразовать методом format_<имя>(value).
+    """
+
+    class Meta:
+        columns = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        self.columns = [
+            (name, self.Meta.columns[name], getattr(self, f'format_{name}', None))
+            for name in select_fields(self.Meta.columns, request)
+        ]
+
+    @classmethod
+    def get_values(cls, request):
+        """Пути для QuerySet.values() с учётом ?fields= и ?omit=."""
+        return [cls.Meta.columns[name] for name in select_fields(cls.Meta.columns, request)]
+
+    def to_representation(self, row):
+        return {
+            name: row[path] if format_value is None else format_value(row[path])
+            for name, path, format_value in self.columns
+        }
+
+    def media_url(self, name):
+        """Ссылка на файл по пути в хранилище, как у FileField."""
+        if not name:
+            return None
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+
+class FlatListMixin:
+    """
+    Для viewset-ов: list с ?flat=1 отдаёт строки .values() через flat_serializer_class.
+    Колонки ключа сортировки (cursor_ordering) добавляются в выборку для пагинации.
+    """
+    flat_serializer_class = None
+
+    def is_flat_list(self):
+        return self.action == 'list' and self.request.query_params.get(FLAT_QUERY_PARAM) in ('1', 'true')
+
+    def get_serializer_class(self):
+        if self.is_flat_list():
+            return self.flat_serializer_class
+        return super().get_serializer_class()
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_flat_list():
+            return super().list(request, *args, **kwargs)
+
+        ordering = [field.lstrip('-') for field in getattr(self, 'cursor_ordering', ())]
+        values = dict.fromkeys(self.flat_serializer_class.get_values(request) + ordering)
+        rows = self.filter_queryset(self.get_queryset()).values(*values)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(rows, many=True).data)
@@ -0,0 +1,179 @@
+"""
+Метрики запросов по именам маршрутов: время ответа, число и время SQL-запросов,
+время сериализации и размер ответа.
+
+MetricsMiddleware измеряет долю запросов METRICS_SAMPLE_RATE, остальные
+проходят без накладных расходов. Данные копятся в памяти процесса и отдаются
+в формате Prometheus на /internal/metrics/ (каждый воркер gunicorn отдаёт
+свои) только с токеном METRICS_TOKEN. Для измеренных запросов добавляется
+заголовок Server-Timing.
+"""
+import hmac
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+def current_metrics():
+    """Метрики текущего запроса или None, если запрос не попал в выборку."""
+    return _current.get()
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = defaultdict(lambda: {
+            'count': 0, 'duration': 0.0, 'buckets': [0] * len(DURATION_BUCKETS),
+            'queries': 0, 'db_time': 0.0, 'serializer_time': 0.0, 'response_bytes': 0,
+        })
+        self._statuses = defaultdict(int)
+
+    def observe(self, route, method, status_code, duration, metrics, response_bytes):
+        with self._lock:
+            stats = self._routes[(route, method)]
+            stats['count'] += 1
+            stats['duration'] += duration
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    stats['buckets'][index] += 1
+            stats['queries'] += metrics.queries
+            stats['db_time'] += metrics.db_time
+            stats['serializer_time'] += metrics.serializer_time
+            stats['response_bytes'] += response_bytes
+            self._statuses[(route, method, f'{status_code // 100}xx')] += 1
+
+    def render(self):
+        with self._lock:
+            routes = {key: dict(value, buckets=list(value['buckets'])) for key, value in self._routes.items()}
+            statuses = dict(self._statuses)
+
+        lines = [
+            '# HELP http_requests_total Измеренные запросы по маршрутам и классам статусов.',
+            '# TYPE http_requests_total counter',
+        ]
+        for (route, method, status_class), count in sorted(statuses.items()):
+            lines.append(f'http_requests_total{{route="{route}",method="{method}",status="{status_class}"}} {count}')
+
+        lines += [
+            '# HELP http_request_duration_seconds Время обработки запроса.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for (route, method), stats in sorted(routes.items()):
+            labels = f'route="{route}",method="{method}"'
+            for bound, count in zip(DURATION_BUCKETS, stats['buckets']):
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats["count"]}')
+            lines.append(f'http_request_duration_seconds_sum{{{labels}}} {stats["duration"]:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{{labels}}} {stats["count"]}')
+
+        counters = [
+            ('http_db_queries_total', 'Число SQL-запросов.', 'queries', '{}'),
+            ('http_db_duration_seconds_total', 'Время SQL-запросов.', 'db_time', '{:.6f}'),
+            ('http_serializer_duration_seconds_total', 'Время сериализации DRF.', 'serializer_time', '{:.6f}'),
+            ('http_response_size_bytes_total', 'Размер тел ответов.', 'response_bytes', '{}'),
+        ]
+        for name, help_text, key, value_format in counters:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for (route, method), stats in sorted(routes.items()):
+                value = value_format.format(stats[key])
+                lines.append(f'{name}{{route="{route}",method="{method}"}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample_rate = settings.METRICS_SAMPLE_RATE
+        if sample_rate <= 0 or random.random() >= sample_rate:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.db_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        route = (match.view_name or match.url_name) if match else 'unresolved'
+        response_bytes = 0 if response.streaming else len(response.content)
+        registry.observe(route, request.method, response.status_code, duration, metrics, response_bytes)
+
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+                f'serializer;dur={metrics.serializer_time * 1000:.1f}',
+                f'total;dur={duration * 1000:.1f}',
+            ])
+        return response
+
+
+class InstrumentedViewMixin:
+    """Для DRF-представлений: учитывает время to_representation сериализатора в метриках запроса."""
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        metrics = current_metrics()
+        if metrics is None:
+            return serializer
+
+        to_representation = serializer.to_representation
+
+        def timed_to_representation(instance):
+            start = time.perf_counter()
+            try:
+                return to_representation(instance)
+            finally:
+                metrics.serializer_time += time.perf_counter() - start
+
+        serializer.to_representation = timed_to_representation
+        return serializer
+
+
+def metrics_view(request):
+    """
+    Метрики в формате Prometheus, только с заголовком Authorization: Bearer <METRICS_TOKEN>.
+    Без METRICS_TOKEN недоступны: за обратным прокси все запросы приходят с 127.0.0.1.
+    """
+    token = settings.METRICS_TOKEN
+    supplied = request.headers.get('Authorization', '')
+    if not token or not hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode()):
+        raise Http404()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
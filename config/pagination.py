@@ -1,7 +1,18 @@
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.response import Response
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime
+import hashlib
+import json
 import math
 
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
 class CustomPageNumberPagination(PageNumberPagination):
     page_size = 12
 
@@ -16,3 +27,156 @@ class CustomPageNumberPagination(PageNumberPagination):
             'total_pages': total_pages,
             'results': data
         })
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Keyset-пагинация: страница выбирается условием по ключу сортировки
+    последней строки, а не OFFSET, поэтому стоимость не зависит от глубины.
+
+    Ключ сортировки берётся из view.cursor_ordering (по умолчанию
+    -submission_date, -id) и может включать аннотации, например status_order.
+    Последнее поле должно быть уникальным. Общее количество считается только
+    по запросу ?with_count=1 и кешируется на count_cache_timeout секунд.
+    """
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    cursor_query_param = 'cursor'
+    count_query_param = 'with_count'
+    count_cache_timeout = 60
+
+    ordering = ('-submission_date', '-id')
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = tuple(getattr(view, 'cursor_ordering', self.ordering))
+        self.page_size = self.get_page_size(request)
+
+        position, reverse = self.decode_cursor(request, queryset)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true'):
+            self.count = self.get_cached_count(queryset)
+
+        ordering = self.reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.has_next = position is not None if reverse else has_more
+        self.has_previous = has_more if reverse else position is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        response = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'page_size': self.page_size,
+        }
+        if self.count is not None:
+            response['count'] = self.count
+        response['results'] = data
+        return Response(response)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
+
+    def get_position(self, instance):
+        # instance — модель или строка .values() (плоские списки, config.fieldsets)
+        if isinstance(instance, dict):
+            return [instance[field.lstrip('-')] for field in self.ordering]
+        return [getattr(instance, field.lstrip('-')) for field in self.ordering]
+
+    @staticmethod
+    def reverse_ordering(ordering):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+    @staticmethod
+    def get_keyset_filter(ordering, position):
+        """(a, b, c) после (x, y, z) == a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)."""
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def get_cached_count(self, queryset):
+        key = 'pagination-count:' + hashlib.md5(str(queryset.query).encode()).hexdigest()
+        return cache.get_or_set(key, queryset.count, self.count_cache_timeout)
+
+    def encode_cursor(self, position, reverse):
+        values = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in position]
+        payload = json.dumps({'p': values, 'r': int(reverse)}, separators=(',', ':'))
+        encoded = urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            position, reverse = payload['p'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # Значения из курсора приводятся к типам полей сортировки, иначе подделанный курсор падает в фильтре
+        try:
+            position = [
+                self.get_ordering_field(queryset, field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in position:
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    @staticmethod
+    def get_ordering_field(queryset, name):
+        """Поле модели или аннотации queryset; для GeneratedField — его output_field."""
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        try:
+            field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise ValueError(name)
+        return getattr(field, 'output_field', field)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': self.cursor_query_param, 'required': False, 'in': 'query', 'schema': {'type': 'string'}},
+            {'name': self.page_size_query_param, 'required': False, 'in': 'query', 'schema': {'type': 'integer'}},
+            {'name': self.count_query_param, 'required': False, 'in': 'query', 'schema': {'type': 'boolean'}},
+        ]
@@ -0,0 +1,134 @@
+"""
+Отдача файлов из хранилища после проверки прав.
+
+При MEDIA_SENDFILE_BACKEND = 'nginx' ответ содержит только X-Accel-Redirect,
+а файл (вместе с Range) отдаёт nginx из internal-локации
+MEDIA_ACCEL_REDIRECT_PREFIX. При 'apache' так же работает X-Sendfile.
+Без фронтового сервера файл отдаёт Django: целиком через FileResponse
+(wsgi.file_wrapper, на gunicorn это sendfile) или диапазоном по Range
+блоками, не читая весь файл в память. ETag и Last-Modified берутся из
+размера и времени изменения файла.
+"""
+import mimetypes
+import os
+import re
+from stat import S_ISREG
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """
+    (start, end) включительно для заголовка Range с одним диапазоном, None, если
+    отдавать нужно весь файл, и ValueError, если диапазон невыполним.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    start, end = match.groups()
+    if start == '':
+        # bytes=-500: последние 500 байт
+        length = int(end)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def iter_range(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def serve_file(request, name, storage=default_storage, as_attachment=False, immutable=False):
+    """
+    Ответ с файлом name из storage; права доступа проверяет вызывающий.
+    immutable — для файлов с хешем содержимого в имени: браузер кеширует их на год без перепроверки.
+    """
+    path = storage.path(name)
+    stat = os.stat(path)
+    if not S_ISREG(stat.st_mode):
+        # Каталог под MEDIA_ROOT (например, /media/uploads/) файлом не является
+        raise Http404()
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    filename = os.path.basename(name)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        pass
+    elif settings.MEDIA_SENDFILE_BACKEND == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(name)
+    elif settings.MEDIA_SENDFILE_BACKEND == 'apache':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        response = serve_with_range(request, path, stat.st_size, content_type, etag, last_modified)
+
+    if response.status_code != 304:
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    # Файлы закрытые: общие кеши их не хранят, браузер перепроверяет по ETag
+    if immutable:
+        patch_cache_control(response, private=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def serve_with_range(request, path, size, content_type, etag, last_modified):
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if range_header and if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None or byte_range == (0, size - 1):
+        return FileResponse(open(path, 'rb'), content_type=content_type)
+
+    start, end = byte_range
+    length = end - start + 1
+    response = StreamingHttpResponse(iter_range(open(path, 'rb'), start, length),
+                                     status=206, content_type=content_type)
+    response['Content-Length'] = str(length)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
@@ -57,6 +57,7 @@ JAZZMIN_SETTINGS = jazzmin_settings.SETTINGS
 JAZZMIN_UI_TWEAKS = jazzmin_settings.UI_TWEAKS
 
 MIDDLEWARE = [
+    'config.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
 
     'django.middleware.security.SecurityMiddleware',
@@ -68,14 +69,32 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Метрики запросов (config.metrics): доля измеряемых запросов и заголовок Server-Timing.
+# /internal/metrics/ отдаётся только с токеном METRICS_TOKEN, без него недоступен.
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', 1.0 if DEBUG else 0.05))
+METRICS_SERVER_TIMING = True
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.StatelessJWTAuthentication',
+    ),
+    # orjson, если установлен, иначе стандартный json (config.renderers)
+    'DEFAULT_RENDERER_CLASSES': (
+        'config.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'config.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ),
     # 'DEFAULT_PAGINATION_CLASS': 'config.pagination.CustomPageNumberPagination',
     # 'PAGE_SIZE': 12
 }
 
+# Сколько секунд полная модель пользователя живёт в кеше users.authentication
+USER_CACHE_TTL = 60
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=115),
@@ -107,8 +126,15 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=5),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
+
+    # Чёрный список refresh-токенов хранится в users.blacklist, а не в приложении token_blacklist
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.BlacklistTokenRefreshSerializer',
+    'TOKEN_BLACKLIST_SERIALIZER': 'users.serializers.LogoutSerializer',
 }
 
+# Как часто (в секундах) удалять из чёрного списка записи об истёкших токенах
+TOKEN_BLACKLIST_PRUNE_INTERVAL = 3600
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -131,13 +157,58 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 
+# Подключение к БД задаётся переменными окружения (или .env).
+# По умолчанию — локальный SQLite, в продакшене DB_ENGINE=django.db.backends.postgresql.
+# Соединения переиспользуются между запросами (DB_CONN_MAX_AGE) и проверяются перед использованием.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.sqlite3'),
+        'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+        'USER': os.getenv('DB_USER', ''),
+        'PASSWORD': os.getenv('DB_PASSWORD', ''),
+        'HOST': os.getenv('DB_HOST', ''),
+        'PORT': os.getenv('DB_PORT', ''),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Реплика для read-only списков (config.db_router.ReplicaReadMixin).
+# Для локальной проверки достаточно второго файла SQLite: DB_REPLICA_NAME=replica.sqlite3
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Относительные пути к файлам SQLite — от корня проекта, а не от текущего каталога
+for database in DATABASES.values():
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        database['NAME'] = BASE_DIR / database['NAME']
+
+DATABASE_ROUTERS = ['config.db_router.ReplicaRouter']
+
+# Через кеш расходятся версия каталога (ETag, схемы полей) и сброс кеша
+# пользователей, поэтому несколько процессов (gunicorn) требуют общего кеша —
+# Redis по REDIS_URL. Без него кеш в памяти процесса: подходит только для
+# одного процесса (runserver, тесты), зато ETag/304 каталога не трогает БД.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -186,4 +257,22 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Отдача медиафайлов (config.sendfile): '' — сам Django, 'nginx' — X-Accel-Redirect, 'apache' — X-Sendfile
+MEDIA_SENDFILE_BACKEND = os.getenv('MEDIA_SENDFILE_BACKEND', '')
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+
+# Миниатюры изображений (config.thumbnails): сторона квадрата в пикселях по именам размеров
+THUMBNAIL_SIZES = {'small': 128, 'medium': 480}
+THUMBNAIL_FORMAT = 'WEBP'
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_WORKERS = 2
+
+# Подписи пользователей (users.signatures): PNG не шире SIGNATURE_MAX_WIDTH пикселей с палитрой из SIGNATURE_COLORS цветов
+SIGNATURE_MAX_WIDTH = 600
+SIGNATURE_COLORS = 16
+
+# Подписи на готовых документах (stamp_documents): ширина подписи и отступ от края страницы в пунктах
+DOCUMENT_STAMP_WIDTH = 150
+DOCUMENT_STAMP_MARGIN = 36
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -0,0 +1,37 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+class QueryBudgetMixin:
+    """
+    Помощники для TestCase, фиксирующие бюджет SQL-запросов эндпоинта.
+
+    assertQueryBudget проверяет один запрос к API, assertConstantQueries —
+    что число запросов не растёт вместе с количеством строк в ответе.
+    """
+
+    def assertQueryBudget(self, budget, url, client=None, method='get', **kwargs):
+        client = client or self.client
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(url, **kwargs)
+
+        self.assertLess(response.status_code, 400, response.content)
+        queries = context.captured_queries
+        self.assertLessEqual(
+            len(queries), budget,
+            f'{method.upper()} {url}: {len(queries)} запросов при бюджете {budget}:\n'
+            + '\n'.join(query['sql'] for query in queries)
+        )
+        return response
+
+    def assertConstantQueries(self, budget, url, populate, sizes=(1, 25), client=None, **kwargs):
+        """
+        populate(n) должна довести количество строк, которые вернёт url, до n.
+        """
+        counts = []
+        for size in sizes:
+            populate(size)
+            with CaptureQueriesContext(connection) as context:
+                self.assertQueryBudget(budget, url, client=client, **kwargs)
+            counts.append(len(context.captured_queries))
+
+        self.assertEqual(len(set(counts)), 1, f'{url}: число запросов зависит от объёма данных: {counts}')
@@ -0,0 +1,126 @@
+"""
+Уменьшенные копии загруженных изображений (аватары, подписи, вложения-картинки).
+
+Копии генерируются один раз в фоновом потоке и лежат в хранилище рядом с
+оригиналами: thumbs/<размер>/<путь оригинала>.<формат>. Сериализаторы
+получают их URL через thumbnail_urls(). Пока копий нет, функция ставит
+генерацию в очередь и возвращает None, а клиент показывает оригинал.
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp'}
+
+_executor = ThreadPoolExecutor(max_workers=settings.THUMBNAIL_WORKERS, thread_name_prefix='thumbnails')
+_lock = threading.Lock()
+_pending = set()
+_failed = set()
+# Имена, для которых копии уже точно есть: не проверяем хранилище на каждом запросе
+_ready = set()
+_READY_LIMIT = 10000
+
+
+def get_format():
+    if settings.THUMBNAIL_FORMAT == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return settings.THUMBNAIL_FORMAT
+
+
+def is_image(name):
+    return bool(name) and os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def thumbnail_path(name, size):
+    extension = 'webp' if get_format() == 'WEBP' else 'jpg'
+    return f'thumbs/{size}/{name}.{extension}'
+
+
+def media_name_from_url(url):
+    """Путь в хранилище по URL вида MEDIA_URL + путь, иначе None."""
+    if isinstance(url, str) and url.startswith(settings.MEDIA_URL):
+        return url[len(settings.MEDIA_URL):]
+    return None
+
+
+def generate_thumbnails(name, storage=default_storage):
+    """Создаёт недостающие копии всех размеров, возвращает их число."""
+    missing = {
+        size: pixels for size, pixels in settings.THUMBNAIL_SIZES.items()
+        if not storage.exists(thumbnail_path(name, size))
+    }
+    if not missing:
+        return 0
+
+    image_format = get_format()
+    with storage.open(name) as original:
+        image = ImageOps.exif_transpose(Image.open(original))
+        image.load()
+
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    elif image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        image = image.convert('RGBA')
+
+    for size, pixels in missing.items():
+        thumbnail = image.copy()
+        thumbnail.thumbnail((pixels, pixels), Image.LANCZOS)
+        buffer = io.BytesIO()
+        thumbnail.save(buffer, image_format, quality=settings.THUMBNAIL_QUALITY)
+        storage.save(thumbnail_path(name, size), ContentFile(buffer.getvalue()))
+    return len(missing)
+
+
+def _generate_in_background(name):
+    try:
+        generate_thumbnails(name)
+    except UnidentifiedImageError:
+        # Расширение картинки у файла, который ей не является: повторять бессмысленно
+        logger.warning('Файл %s не является изображением, миниатюры не созданы', name)
+        with _lock:
+            _failed.add(name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+        with _lock:
+            _failed.add(name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+
+
+def schedule_thumbnails(name):
+    with _lock:
+        if name in _pending or name in _failed:
+            return
+        _pending.add(name)
+    _executor.submit(_generate_in_background, name)
+
+
+def thumbnail_urls(name, request=None, storage=default_storage):
+    """{размер: URL} для изображения или None, если копии ещё не готовы или это не изображение."""
+    if not is_image(name):
+        return None
+
+    paths = {size: thumbnail_path(name, size) for size in settings.THUMBNAIL_SIZES}
+    if name not in _ready:
+        if not all(storage.exists(path) for path in paths.values()):
+            schedule_thumbnails(name)
+            return None
+        with _lock:
+            if len(_ready) >= _READY_LIMIT:
+                _ready.clear()
+            _ready.add(name)
+
+    urls = {size: storage.url(path) for size, path in paths.items()}
+    if request is not None:
+        urls = {size: request.build_absolute_uri(url) for size, url in urls.items()}
+    return urls
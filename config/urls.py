@@ -1,15 +1,20 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 
 from django.conf import settings
 from django.conf.urls.static import static
 
+from applications.views import ProtectedMediaView
+from config.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/users/', include('users.urls')),
     path('api/applications/', include('applications.urls')),
+    path('internal/metrics/', metrics_view, name='metrics'),
+    # Медиафайлы отдаются только после проверки прав, в том числе в DEBUG
+    re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<name>.+)$', ProtectedMediaView.as_view(), name='media'),
 ]
 
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
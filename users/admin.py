@@ -1,4 +1,51 @@
+import io
+
+from django import forms
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from .importing import StudentImport
 from .models import User
 
-admin.site.register(User)
+
+class StudentImportForm(forms.Form):
+    file = forms.FileField(label='CSV-файл', help_text='Колонки: username, email, password[, first_name, last_name, phone_number, role].')
+    dry_run = forms.BooleanField(label='Только проверить', required=False)
+
+
+@admin.register(User)
+class UserAdmin(admin.ModelAdmin):
+    search_fields = ('username', 'email')
+    list_display = ('username', 'email', 'role', 'is_active')
+    list_filter = ('role', 'is_active')
+    # Кнопка «Импорт из CSV» рядом с «Добавить»
+    change_list_template = 'admin/users/user/change_list.html'
+
+    def get_urls(self):
+        urls = [
+            path('import/', self.admin_site.admin_view(self.import_view), name='users_user_import'),
+        ]
+        return urls + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        importer = None
+        form = StudentImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            importer = StudentImport(dry_run=form.cleaned_data['dry_run'])
+            try:
+                importer.run(io.TextIOWrapper(form.cleaned_data['file'], encoding='utf-8-sig', newline=''))
+            except (ValueError, UnicodeDecodeError) as error:
+                form.add_error('file', str(error))
+                importer = None
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Импорт студентов',
+            'form': form,
+            'importer': importer,
+        }
+        return TemplateResponse(request, 'admin/users/user/import_students.html', context)
@@ -0,0 +1,113 @@
+"""
+JWT-аутентификация без запроса пользователя на каждый вызов API.
+
+Для GET/HEAD/OPTIONS пользователь собирается из claims access-токена
+(user_id, username, email, role — их кладёт MyTokenObtainPairSerializer).
+Поля, которых в токене нет, подгружаются при первом обращении из кеша с
+коротким TTL (USER_CACHE_TTL), а при промахе — из БД. Когда пользователя
+деактивируют, удаляют или меняют ему роль, users.signals записывает в кеш
+метку отзыва, и принимаются только токены с этой меткой в claim rev, то есть
+выпущенные после отзыва, — на чтении это одно обращение к кешу, без загрузки
+пользователя. Новую роль клиент получает через refresh. Запросы на запись
+получают обычную модель User, как в JWTAuthentication.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+
+CLAIMS = ('username', 'email', 'role')
+
+
+def user_cache_key(user_id):
+    return f'users:user:{user_id}'
+
+
+def get_cached_user(user_id):
+    key = user_cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        try:
+            user = User.objects.get(pk=user_id, is_active=True)
+        except User.DoesNotExist:
+            raise AuthenticationFailed('Пользователь не найден или неактивен.', code='user_not_found')
+        cache.set(key, user, settings.USER_CACHE_TTL)
+    return user
+
+
+def forget_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def revoked_key(user_id):
+    return f'users:revoked:{user_id}'
+
+
+def revoke_access_tokens(user_id):
+    """Отзывает выданные access-токены пользователя: принимаются только выпущенные после отзыва."""
+    # Дольше ACCESS_TOKEN_LIFETIME метку хранить незачем: выпущенные раньше токены к тому времени истекут
+    lifetime = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+    cache.set(revoked_key(user_id), time.time_ns(), lifetime)
+
+
+def get_revocation(user_id):
+    """Метка последнего отзыва, её несёт claim rev токенов, выпущенных после него."""
+    return cache.get(revoked_key(user_id))
+
+
+def is_revoked(token):
+    revocation = get_revocation(token[api_settings.USER_ID_CLAIM])
+    return revocation is not None and token.get('rev') != revocation
+
+
+class ClaimsUser(TokenUser):
+    """Пользователь из claims токена; остальные поля берёт у полной модели, загружая её лениво."""
+
+    @cached_property
+    def email(self):
+        return self.token.get('email', '')
+
+    @cached_property
+    def role(self):
+        return self.token['role']
+
+    @cached_property
+    def user(self):
+        return get_cached_user(self.id)
+
+    def __str__(self):
+        return self.username
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self.user, attr)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        if request.method not in SAFE_METHODS:
+            return super().authenticate(request)
+
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if not all(claim in validated_token for claim in CLAIMS):
+            # Токен выпущен без наших claims (например, стандартным TokenObtainPairView)
+            return self.get_user(validated_token), validated_token
+        if is_revoked(validated_token):
+            raise AuthenticationFailed('Токен отозван, обновите его.', code='token_revoked')
+        return ClaimsUser(validated_token), validated_token
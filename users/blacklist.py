@@ -0,0 +1,50 @@
+"""
+Чёрный список refresh-токенов по JTI.
+
+Список хранится в таблице, а не в кеше или файле: кеш может вытеснить
+запись, и отозванный токен снова заработает, а файл на диске не виден
+другим воркерам и серверам. Проверка — поиск по первичному ключу. Записи
+нужны только до истечения токена, поэтому просроченные удаляются не реже
+раза в TOKEN_BLACKLIST_PRUNE_INTERVAL секунд при добавлении новых и
+командой token_blacklist_stats --prune. Размер таблицы ограничен числом
+ротаций за REFRESH_TOKEN_LIFETIME.
+"""
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import BlacklistedToken
+
+_last_prune = 0.0
+
+
+def is_blacklisted(jti):
+    return BlacklistedToken.objects.filter(pk=jti).exists()
+
+
+def add_to_blacklist(jti, exp):
+    """Добавляет токен, False — если он уже был в списке (повторное использование)."""
+    expires_at = datetime.fromtimestamp(exp, tz=dt_timezone.utc)
+    try:
+        with transaction.atomic():
+            BlacklistedToken.objects.create(jti=jti, expires_at=expires_at)
+    except IntegrityError:
+        return False
+    prune_if_due()
+    return True
+
+
+def prune():
+    deleted, _ = BlacklistedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
+
+
+def prune_if_due():
+    global _last_prune
+    now = time.monotonic()
+    if now - _last_prune >= settings.TOKEN_BLACKLIST_PRUNE_INTERVAL:
+        _last_prune = now
+        prune()
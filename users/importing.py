@@ -0,0 +1,152 @@
+"""
+Массовый импорт студентов из CSV.
+
+Файл читается пачками по chunk_size строк. Для каждой пачки: проверка полей
+и паролей, одна выборка по индексам username и lower(email) для поиска уже
+существующих пользователей, хеширование паролей в пуле процессов (PBKDF2
+занимает основное время) и bulk_create. По каждой пропущенной строке
+в отчёт попадает номер строки и причины.
+
+Колонки: username, email, password; необязательные first_name, last_name,
+phone_number, role (по умолчанию student).
+"""
+import csv
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .models import User
+
+REQUIRED_COLUMNS = ('username', 'email', 'password')
+
+
+def _init_worker():
+    # При запуске через spawn дочерний процесс должен сам настроить Django
+    django.setup()
+
+
+def read_rows(file):
+    """(номер строки, dict) для CSV-файла, первая строка — заголовок."""
+    reader = csv.DictReader(file)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+    if missing:
+        raise ValueError(f'В файле нет колонок: {", ".join(missing)}.')
+    for row in reader:
+        yield reader.line_num, {key: (value or '').strip() for key, value in row.items() if key}
+
+
+def validate_row(row):
+    errors = []
+    user = User(
+        username=row['username'],
+        email=User.objects.normalize_email(row['email']),
+        first_name=row.get('first_name', ''),
+        last_name=row.get('last_name', ''),
+        phone_number=row.get('phone_number') or None,
+        role=row.get('role') or User.Roles.STUDENT,
+    )
+    if not user.username:
+        errors.append('Пустой username.')
+    else:
+        try:
+            User.username_validator(user.username)
+        except ValidationError as error:
+            errors.extend(error.messages)
+    try:
+        validate_email(user.email)
+    except ValidationError as error:
+        errors.extend(error.messages)
+    if user.role not in User.Roles.values:
+        errors.append(f'Неизвестная роль {user.role!r}.')
+    if user.phone_number and len(user.phone_number) > 11:
+        errors.append('Номер телефона длиннее 11 символов.')
+    try:
+        validate_password(row['password'], user)
+    except ValidationError as error:
+        errors.extend(error.messages)
+    return user, errors
+
+
+class StudentImport:
+    def __init__(self, chunk_size=1000, workers=None, dry_run=False):
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.dry_run = dry_run
+        self.created = 0
+        self.errors = []
+        self._seen_usernames = set()
+        self._seen_emails = set()
+
+    def run(self, file):
+        rows = read_rows(file)
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as pool:
+            while chunk := list(islice(rows, self.chunk_size)):
+                self.import_chunk(chunk, pool)
+        return self
+
+    def reject(self, line, row, *messages):
+        self.errors.append({'line': line, 'username': row.get('username', ''), 'errors': list(messages)})
+
+    def import_chunk(self, chunk, pool):
+        candidates = []
+        for line, row in chunk:
+            user, errors = validate_row(row)
+            if errors:
+                self.reject(line, row, *errors)
+            elif user.username in self._seen_usernames or user.email.lower() in self._seen_emails:
+                self.reject(line, row, 'Повтор username или email в файле.')
+            else:
+                self._seen_usernames.add(user.username)
+                self._seen_emails.add(user.email.lower())
+                candidates.append((line, row, user))
+
+        # Уже существующие пользователи: одна выборка по индексам username и lower(email)
+        usernames = [user.username for _, _, user in candidates]
+        emails = [user.email.lower() for _, _, user in candidates]
+        existing = User.objects.annotate(email_lower=Lower('email')) \
+            .filter(Q(username__in=usernames) | Q(email_lower__in=emails)).values_list('username', 'email')
+        taken_usernames = {username for username, _ in existing}
+        taken_emails = {email.lower() for _, email in existing}
+
+        new = []
+        for line, row, user in candidates:
+            if user.username in taken_usernames:
+                self.reject(line, row, 'Пользователь с таким username уже есть.')
+            elif user.email.lower() in taken_emails:
+                self.reject(line, row, 'Пользователь с таким email уже есть.')
+            else:
+                new.append((line, row, user))
+        if self.dry_run:
+            # Пробный прогон: считаем, сколько было бы создано
+            self.created += len(new)
+            return
+        if not new:
+            return
+
+        passwords = [row['password'] for _, row, _ in new]
+        for (_, _, user), password in zip(new, pool.map(make_password, passwords, chunksize=32)):
+            user.password = password
+
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([user for _, _, user in new], batch_size=1000)
+        except IntegrityError:
+            # Кто-то создал такого же пользователя между проверкой и вставкой
+            for line, row, _ in new:
+                self.reject(line, row, 'Конфликт при сохранении, повторите импорт строки.')
+            return
+        self.created += len(new)
+
+    def write_report(self, file):
+        writer = csv.writer(file)
+        writer.writerow(['line', 'username', 'errors'])
+        for error in self.errors:
+            writer.writerow([error['line'], error['username'], ' '.join(error['errors'])])
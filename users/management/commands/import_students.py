@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users.importing import StudentImport
+
+
+class Command(BaseCommand):
+    help = 'Импортирует студентов из CSV (username, email, password[, first_name, last_name, phone_number, role]).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV-файл в UTF-8.')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, help='Процессов для хеширования паролей, по умолчанию по числу ядер.')
+        parser.add_argument('--report', help='Куда записать CSV-отчёт об ошибках, по умолчанию в stdout.')
+        parser.add_argument('--dry-run', action='store_true', help='Только проверить файл, ничего не создавать.')
+
+    def handle(self, *args, **options):
+        importer = StudentImport(options['chunk_size'], options['workers'], options['dry_run'])
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as file:
+                importer.run(file)
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        if importer.errors:
+            if options['report']:
+                with open(options['report'], 'w', encoding='utf-8', newline='') as report:
+                    importer.write_report(report)
+            else:
+                importer.write_report(self.stdout)
+
+        verb = 'Будет создано' if options['dry_run'] else 'Создано'
+        self.stdout.write(self.style.SUCCESS(f'{verb}: {importer.created}, строк с ошибками: {len(importer.errors)}'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from users.blacklist import prune
+from users.models import BlacklistedToken
+
+
+class Command(BaseCommand):
+    help = 'Показывает размер чёрного списка refresh-токенов, с --prune удаляет записи об истёкших токенах.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['prune']:
+            self.stdout.write(f'Удалено истёкших записей: {prune()}')
+
+        stats = BlacklistedToken.objects.aggregate(oldest=Min('expires_at'), newest=Max('expires_at'))
+        total = BlacklistedToken.objects.count()
+        expired = BlacklistedToken.objects.filter(expires_at__lte=timezone.now()).count()
+        self.stdout.write(f'Записей: {total}, из них истёкших: {expired}')
+        if total:
+            self.stdout.write(f'Истекают с {stats["oldest"]:%Y-%m-%d %H:%M} по {stats["newest"]:%Y-%m-%d %H:%M}')
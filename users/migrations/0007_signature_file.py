@@ -0,0 +1,97 @@
+# Generated by Django 5.0.4 on 2026-10-18 11:02
+
+import base64
+import binascii
+import hashlib
+import io
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Копия преобразования из users.signatures с настройками на момент миграции:
+# изменения модуля и SIGNATURE_MAX_WIDTH/SIGNATURE_COLORS не должны менять результат
+MAX_WIDTH = 600
+COLORS = 16
+
+
+def decode_data_url(value):
+    header, separator, data = (value or '').partition(',')
+    if not separator or not header.startswith('data:image/') or not header.endswith(';base64'):
+        return None
+    try:
+        return base64.b64decode(data, validate=True)
+    except binascii.Error:
+        return None
+
+
+def normalize_signature(content):
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            image = ImageOps.exif_transpose(image).convert('RGBA')
+    except (UnidentifiedImageError, OSError):
+        return None
+
+    box = image.getchannel('A').getbbox()
+    if box is None:
+        return None
+    image = image.crop(box)
+    if image.width > MAX_WIDTH:
+        image = image.resize((MAX_WIDTH, max(1, round(image.height * MAX_WIDTH / image.width))), Image.LANCZOS)
+
+    output = io.BytesIO()
+    image.quantize(COLORS, method=Image.Quantize.FASTOCTREE).save(output, 'PNG', optimize=True)
+    return output.getvalue()
+
+
+def store_signatures(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    users = User.objects.using(schema_editor.connection.alias) \
+        .exclude(signature_data__isnull=True).exclude(signature_data='')
+    for user in users.only('id', 'signature_data').iterator(chunk_size=500):
+        content = decode_data_url(user.signature_data)
+        png = normalize_signature(content) if content is not None else None
+        if png is None:
+            # Не data URL изображения — такую подпись всё равно нельзя было показать
+            continue
+        sha256 = hashlib.sha256(png).hexdigest()
+        path = f'signatures/{sha256[:2]}/{sha256}.png'
+        if not default_storage.exists(path):
+            default_storage.save(path, ContentFile(png))
+        user.signature = path
+        user.save(update_fields=['signature'])
+
+
+def restore_data_urls(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    users = User.objects.using(schema_editor.connection.alias).exclude(signature='').exclude(signature__isnull=True)
+    for user in users.iterator(chunk_size=500):
+        with default_storage.open(user.signature.name, 'rb') as file:
+            user.signature_data = 'data:image/png;base64,' + base64.b64encode(file.read()).decode()
+        user.save(update_fields=['signature_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_user_email_index'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='user',
+            old_name='signature',
+            new_name='signature_data',
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='signature',
+            field=models.FileField(blank=True, null=True, upload_to='signatures/'),
+        ),
+        migrations.RunPython(store_signatures, restore_data_urls),
+        migrations.RemoveField(
+            model_name='user',
+            name='signature_data',
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.db.models.functions import Lower
 
 class User(AbstractUser):
     class Roles(models.TextChoices):
@@ -16,7 +17,29 @@ class User(AbstractUser):
         default=Roles.STUDENT
     )
 
-    signature = models.TextField(null=True, blank=True)
+    # Нормализованный PNG с хешем содержимого в имени, сохраняет users.signatures
+    signature = models.FileField(upload_to='signatures/', null=True, blank=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Поиск дубликатов при импорте студентов: email сравнивается без учёта регистра
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+        ]
 
     def __str__(self):
         return self.username
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Роль и активность на момент загрузки: при их смене users.signals отзывает access-токены
+        instance._loaded_access = (instance.__dict__.get('role'), instance.__dict__.get('is_active'))
+        return instance
+
+class BlacklistedToken(models.Model):
+    """Отозванный refresh-токен. После expires_at токен невалиден и без записи, строку можно удалять."""
+    jti = models.CharField(max_length=255, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti
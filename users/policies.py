@@ -0,0 +1,108 @@
+"""
+Права доступа по ролям.
+
+Роль и id берутся у request.user: на чтении это ClaimsUser с ролью из
+claims access-токена (проверка прав не обращается к БД), на записи —
+загруженная модель User, так что смена роли действует сразу. Refresh
+выпускает claims заново из БД. Policy собирается один раз на запрос через
+get_policy(request).
+
+RULES — единственное место, где описано, какой роли какое действие вьюсета
+разрешено. Вьюсет указывает свой раздел атрибутом policy, а видимые объекты
+ограничивает через Policy.scope().
+"""
+from rest_framework.permissions import BasePermission
+
+from .models import User
+
+Roles = User.Roles
+
+ADMINS = frozenset({Roles.ADMIN})
+SIGNERS = frozenset({Roles.ADMIN, Roles.PRORECTOR})
+STAFF = frozenset({Roles.ADMIN, Roles.PRORECTOR, Roles.REVIEWER})
+EVERYONE = STAFF | {Roles.STUDENT}
+
+RULES = {
+    'applications': {
+        'list': EVERYONE,
+        'retrieve': EVERYONE,
+        'history': EVERYONE,
+        'export': STAFF,
+        'create': EVERYONE,
+        'upload_document': EVERYONE,
+        'change_status': STAFF,
+        'accept': STAFF,
+        'reject': STAFF,
+        'complete': SIGNERS,
+        'bulk_action': STAFF,
+        'update': ADMINS,
+        'partial_update': ADMINS,
+        'destroy': ADMINS,
+    },
+    'prorector-queue': {
+        'list': SIGNERS,
+        'retrieve': SIGNERS,
+    },
+    'review-queue': {
+        'list': STAFF,
+        'retrieve': STAFF,
+    },
+    'prorector-actions': {
+        'sign': SIGNERS,
+        'reject': SIGNERS,
+    },
+    'statistics': {
+        'get': STAFF,
+    },
+    'users': {
+        'list': STAFF,
+        'retrieve': STAFF,
+        'create': ADMINS,
+        'update': ADMINS,
+        'partial_update': ADMINS,
+        'destroy': ADMINS,
+    },
+}
+
+
+class Policy:
+    def __init__(self, role=None, user_id=None):
+        self.role = role
+        self.user_id = user_id
+
+    @classmethod
+    def from_request(cls, request):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return cls()
+        return cls(role=user.role, user_id=user.pk)
+
+    @property
+    def is_staff(self):
+        return self.role in STAFF
+
+    def allows(self, section, action):
+        return self.role in RULES[section].get(action, ())
+
+    def scope(self, queryset, owner_field):
+        """Объекты, видимые роли: студенту — только свои, сотрудникам — все."""
+        if self.is_staff:
+            return queryset
+        if self.role == Roles.STUDENT:
+            return queryset.filter(**{owner_field: self.user_id})
+        return queryset.none()
+
+
+def get_policy(request):
+    policy = getattr(request, '_policy', None)
+    if policy is None:
+        policy = request._policy = Policy.from_request(request)
+    return policy
+
+
+class RolePermission(BasePermission):
+    """Пускает к действию вьюсета (для APIView — к HTTP-методу) роли из RULES[view.policy]."""
+
+    def has_permission(self, request, view):
+        action = getattr(view, 'action', None) or request.method.lower()
+        return get_policy(request).allows(view.policy, action)
@@ -1,25 +1,69 @@
 # serializers.py
 
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth.password_validation import validate_password
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenBlacklistSerializer, TokenObtainPairSerializer, \
+    TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from config.fieldsets import SparseFieldsetsMixin, ValuesSerializer
+from config.thumbnails import thumbnail_urls
+from .authentication import get_revocation
 from .models import User
+from .signatures import signature_from_value
+from .tokens import BlacklistableRefreshToken
+
+
+def set_user_claims(token, user):
+    token['username'] = user.username
+    token['email'] = user.email
+    token['role'] = user.role
+    revocation = get_revocation(user.pk)
+    if revocation is not None:
+        token['rev'] = revocation
 
 
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = BlacklistableRefreshToken
+
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
 
         # Add custom claims
-        token['username'] = user.username
-        token['email'] = user.email
-        token['role'] = user.role
+        set_user_claims(token, user)
         # ...
 
         return token
 
 
+class BlacklistTokenRefreshSerializer(TokenRefreshSerializer):
+    """Ротация refresh-токена; claims пользователя выпускаются заново из БД, а не копируются из старого токена."""
+
+    token_class = BlacklistableRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(pk=refresh[api_settings.USER_ID_CLAIM], is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed('Пользователь не найден или неактивен.', code='user_not_found')
+        set_user_claims(refresh, user)
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return data
+
+
+class LogoutSerializer(TokenBlacklistSerializer):
+    token_class = BlacklistableRefreshToken
+
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(
         write_only=True, required=True, validators=[validate_password])
@@ -52,18 +96,70 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 
-class UserSerializer(serializers.ModelSerializer):
+class AvatarThumbnailsMixin(serializers.Serializer):
+    avatar_thumbnails = serializers.SerializerMethodField()
+
+    def get_avatar_thumbnails(self, obj):
+        return thumbnail_urls(obj.avatar.name, self.context.get('request'))
+
+
+class SignatureField(serializers.Field):
+    """Принимает data URL или файл изображения, отдаёт только ссылку на сохранённый PNG."""
+
+    def to_internal_value(self, data):
+        if data == '':
+            return None
+        try:
+            return signature_from_value(data)
+        except ValueError as error:
+            raise serializers.ValidationError(str(error))
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get('request')
+        return request.build_absolute_uri(value.url) if request else value.url
+
+
+class UserSerializer(SparseFieldsetsMixin, AvatarThumbnailsMixin, serializers.ModelSerializer):
+    signature = SignatureField(required=False, allow_null=True)
+
     class Meta:
         model = User
-        fields = ['username', 'role', 'first_name', 'last_name', 'avatar', 'phone_number', 'signature']
+        fields = ['username', 'role', 'first_name', 'last_name', 'avatar', 'avatar_thumbnails', 'phone_number',
+                  'signature']
+
+
+class UserListSerializer(ValuesSerializer):
+    """Плоская строка списка пользователей (?flat=1), без миниатюр аватара."""
+
+    class Meta:
+        columns = {
+            'id': 'id',
+            'username': 'username',
+            'role': 'role',
+            'first_name': 'first_name',
+            'last_name': 'last_name',
+            'avatar': 'avatar',
+            'phone_number': 'phone_number',
+            'signature': 'signature',
+        }
+
+    def format_avatar(self, value):
+        return self.media_url(value)
+
+    def format_signature(self, value):
+        return self.media_url(value)
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(AvatarThumbnailsMixin, serializers.ModelSerializer):
     role = serializers.CharField(source='get_role_display', read_only=True)
+    signature = SignatureField(required=False, allow_null=True)
 
     class Meta:
         model = User
-        fields = ['username', 'first_name', 'last_name', 'phone_number', 'avatar', 'signature', 'role']
+        fields = ['username', 'first_name', 'last_name', 'phone_number', 'avatar', 'avatar_thumbnails', 'signature',
+                  'role']
 
     def validate_username(self, value):
         if User.objects.exclude(pk=self.instance.pk).filter(username=value).exists():
@@ -0,0 +1,38 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from config.thumbnails import is_image, schedule_thumbnails
+from .authentication import forget_cached_user, revoke_access_tokens
+from .models import User
+
+
+@receiver(post_save, sender=User)
+def generate_avatar_thumbnails(sender, instance, raw=False, **kwargs):
+    if not raw and is_image(instance.avatar.name):
+        transaction.on_commit(lambda: schedule_thumbnails(instance.avatar.name))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # После delete() pk экземпляра обнуляется раньше, чем сработает on_commit
+    user_id = instance.pk
+    transaction.on_commit(lambda: forget_cached_user(user_id))
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_access_change(sender, instance, created=False, raw=False, **kwargs):
+    # Роль есть в claims access-токена, is_active проверяется только при выпуске: при их смене
+    # ранее выпущенные токены отзываются, остальные поля токен не кеширует
+    access = (instance.role, instance.is_active)
+    if not (created or raw) and (not instance.is_active or getattr(instance, '_loaded_access', None) != access):
+        user_id = instance.pk
+        transaction.on_commit(lambda: revoke_access_tokens(user_id))
+    instance._loaded_access = access
+
+
+@receiver(post_delete, sender=User)
+def revoke_tokens_on_delete(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: revoke_access_tokens(user_id))
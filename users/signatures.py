@@ -0,0 +1,82 @@
+"""
+Хранение подписей пользователей.
+
+Подпись приходит data URL с canvas или файлом изображения. Она один раз
+приводится к компактному PNG: поля обрезаются по непрозрачным пикселям,
+ширина ограничивается SIGNATURE_MAX_WIDTH, цвета сводятся к палитре с
+прозрачностью. Файл сохраняется по пути signatures/<sha256[:2]>/<sha256>.png
+и больше не меняется, поэтому отдаётся с долгим кешированием, а в API
+передаётся только ссылка на него.
+"""
+import base64
+import binascii
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+SIGNATURES_DIR = 'signatures'
+
+
+def decode_data_url(value):
+    """(байты, расширение) изображения из data URL вида data:image/png;base64,... или None."""
+    header, separator, data = (value or '').partition(',')
+    if not separator or not header.startswith('data:image/') or not header.endswith(';base64'):
+        return None
+    try:
+        content = base64.b64decode(data, validate=True)
+    except binascii.Error:
+        return None
+    extension = header[len('data:image/'):-len(';base64')]
+    return content, 'jpg' if extension == 'jpeg' else extension
+
+
+def normalize_signature(content):
+    """Байты PNG для изображения подписи; ValueError, если это не изображение."""
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            image = ImageOps.exif_transpose(image).convert('RGBA')
+    except (UnidentifiedImageError, OSError) as error:
+        raise ValueError('Некорректное изображение подписи.') from error
+
+    box = image.getchannel('A').getbbox()
+    if box is None:
+        raise ValueError('Подпись пустая.')
+    image = image.crop(box)
+    max_width = settings.SIGNATURE_MAX_WIDTH
+    if image.width > max_width:
+        image = image.resize((max_width, max(1, round(image.height * max_width / image.width))), Image.LANCZOS)
+
+    output = io.BytesIO()
+    image.quantize(settings.SIGNATURE_COLORS, method=Image.Quantize.FASTOCTREE).save(output, 'PNG', optimize=True)
+    return output.getvalue()
+
+
+def store_signature(content, storage=default_storage):
+    """Нормализует подпись и сохраняет, если такой ещё нет; возвращает путь в хранилище."""
+    png = normalize_signature(content)
+    sha256 = hashlib.sha256(png).hexdigest()
+    path = f'{SIGNATURES_DIR}/{sha256[:2]}/{sha256}.png'
+    if not storage.exists(path):
+        saved_path = storage.save(path, ContentFile(png))
+        if saved_path != path:
+            # Ту же подпись параллельно сохранил другой запрос
+            storage.delete(saved_path)
+    return path
+
+
+def signature_from_value(value, storage=default_storage):
+    """Путь сохранённой подписи для data URL или загруженного файла."""
+    if isinstance(value, str):
+        decoded = decode_data_url(value)
+        if decoded is None:
+            raise ValueError('Подпись должна быть data URL изображения или файлом.')
+        content = decoded[0]
+    elif hasattr(value, 'read'):
+        content = value.read()
+    else:
+        raise ValueError('Подпись должна быть data URL изображения или файлом.')
+    return store_signature(content, storage)
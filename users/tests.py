@@ -1,3 +1,160 @@
-from django.test import TestCase
+import base64
+import io
+import tempfile
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from .importing import StudentImport
+from .models import BlacklistedToken, User
+
+
+class StatelessAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('student', password='pass', first_name='Иван')
+        self.client = APIClient()
+        tokens = self.client.post('/api/users/token/', {'username': 'student', 'password': 'pass'}).json()
+        self.refresh = tokens['refresh']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+
+    def test_fields_outside_token_come_from_cache(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/users/profile/').json()['first_name'], 'Иван')
+        with self.assertNumQueries(0):
+            self.client.get('/api/users/profile/')
+
+        self.user.first_name = 'Пётр'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get('/api/users/profile/').json()['first_name'], 'Пётр')
+
+    def test_deactivated_user_loses_access_at_once(self):
+        with self.assertNumQueries(1):
+            # Только сама страница: пользователь не загружается, отзыв проверяется по кешу
+            self.assertEqual(self.client.get('/api/applications/list/').status_code, 200)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get('/api/applications/list/').status_code, 401)
+        self.assertEqual(self.client.post('/api/users/token/refresh/', {'refresh': self.refresh}).status_code, 401)
+
+    def test_role_change_revokes_issued_tokens(self):
+        self.user.first_name = 'Пётр'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get('/api/applications/list/').status_code, 200)
+
+        user = User.objects.get(pk=self.user.pk)
+        user.role = User.Roles.REVIEWER
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertEqual(self.client.get('/api/applications/list/').status_code, 401)
+
+        access = self.client.post('/api/users/token/refresh/', {'refresh': self.refresh}).json()['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(self.client.get('/api/applications/list-for-preview/').status_code, 200)
+
+
+class TokenBlacklistTests(TestCase):
+    def setUp(self):
+        User.objects.create_user('student', password='pass')
+        self.client = APIClient()
+        self.refresh = self.client.post('/api/users/token/', {'username': 'student', 'password': 'pass'}).json()['refresh']
+
+    def test_rotated_token_cannot_be_reused(self):
+        response = self.client.post('/api/users/token/refresh/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('refresh', response.json())
+
+        self.assertEqual(self.client.post('/api/users/token/refresh/', {'refresh': self.refresh}).status_code, 401)
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+    def test_logout_and_pruning(self):
+        self.assertEqual(self.client.post('/api/users/token/logout/', {'refresh': self.refresh}).status_code, 200)
+        self.assertEqual(self.client.post('/api/users/token/refresh/', {'refresh': self.refresh}).status_code, 401)
+
+        BlacklistedToken.objects.create(jti='expired', expires_at=timezone.now() - timedelta(days=1))
+        call_command('token_blacklist_stats', '--prune', stdout=io.StringIO())
+        self.assertFalse(BlacklistedToken.objects.filter(pk='expired').exists())
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+
+class StudentImportTests(TestCase):
+    def test_import_reports_rejected_rows(self):
+        User.objects.create_user('taken', email='taken@example.com', password='pass')
+        file = io.StringIO(
+            'username,email,password,last_name\n'
+            'ivanov,ivanov@example.com,Sup3r-secret,Иванов\n'
+            'petrov,not-an-email,Sup3r-secret,Петров\n'
+            'ivanov,other@example.com,Sup3r-secret,Иванов\n'
+            'taken,new@example.com,Sup3r-secret,\n'
+            'sidorov,sidorov@example.com,Sup3r-secret,Сидоров\n'
+        )
+
+        importer = StudentImport(chunk_size=2, workers=1).run(file)
+
+        self.assertEqual(importer.created, 2)
+        self.assertEqual([error['line'] for error in importer.errors], [3, 4, 5])
+        user = User.objects.get(username='ivanov')
+        self.assertEqual((user.last_name, user.role), ('Иванов', User.Roles.STUDENT))
+        self.assertTrue(user.check_password('Sup3r-secret'))
+
+    def test_existing_email_is_matched_case_insensitively(self):
+        User.objects.create_user('ivanov', email='Ivanov@Example.com', password='pass')
+        file = io.StringIO('username,email,password\nivan,ivanov@example.com,Sup3r-secret\n')
+
+        importer = StudentImport(workers=1).run(file)
+
+        self.assertEqual(importer.created, 0)
+        self.assertEqual(importer.errors[0]['errors'], ['Пользователь с таким email уже есть.'])
+
+    def test_changelist_links_to_import(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='pass'))
+        response = self.client.get('/admin/users/user/')
+        self.assertContains(response, 'href="/admin/users/user/import/"')
+        self.assertEqual(self.client.get('/admin/users/user/import/').status_code, 200)
+
+
+class SignatureStorageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+        image = io.BytesIO()
+        Image.new('RGBA', (1200, 400), (0, 0, 0, 0)).save(image, 'PNG')
+        self.data_url = 'data:image/png;base64,' + base64.b64encode(image.getvalue()).decode()
+        self.user = User.objects.create_user('prorector', role=User.Roles.PRORECTOR)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_signature_is_stored_once_and_listed_by_url(self):
+        self.assertEqual(self.client.patch('/api/users/profile/', {'signature': self.data_url}).status_code, 400)
+
+        image = io.BytesIO()
+        Image.new('RGBA', (1200, 400), (0, 0, 128, 255)).save(image, 'PNG')
+        data_url = 'data:image/png;base64,' + base64.b64encode(image.getvalue()).decode()
+        response = self.client.patch('/api/users/profile/', {'signature': data_url})
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        name = self.user.signature.name
+        self.assertRegex(name, r'^signatures/[0-9a-f]{2}/[0-9a-f]{64}\.png$')
+        self.assertEqual(Image.open(self.user.signature).width, 600)
+        self.assertTrue(response.json()['signature'].endswith(name))
+
+        self.client.patch('/api/users/profile/', {'signature': data_url})
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.signature.name, name)
+
+        [listed] = self.client.get('/api/users/list/').json()
+        self.assertTrue(listed['signature'].endswith(name))
+
+        response = self.client.get(listed['signature'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
@@ -0,0 +1,19 @@
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .blacklist import add_to_blacklist, is_blacklisted
+
+
+class BlacklistableRefreshToken(RefreshToken):
+    """Refresh-токен с проверкой по users.blacklist вместо приложения token_blacklist."""
+
+    def verify(self):
+        super().verify()
+        if is_blacklisted(self[api_settings.JTI_CLAIM]):
+            raise TokenError('Токен отозван.')
+
+    def blacklist(self):
+        # Два параллельных обновления одним токеном: второе получит ошибку
+        if not add_to_blacklist(self[api_settings.JTI_CLAIM], self['exp']):
+            raise TokenError('Токен отозван.')
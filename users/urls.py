@@ -2,6 +2,7 @@ from django.urls import include, path
 from rest_framework import routers
 
 from rest_framework_simplejwt.views import (
+    TokenBlacklistView,
     TokenRefreshView,
 )
 
@@ -17,6 +18,7 @@ urlpatterns = [
 
     path('token/', views.MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/logout/', TokenBlacklistView.as_view(), name='token_logout'),
     path('register/', views.RegisterView.as_view(), name='auth_register'),
 
     path('profile/', UserProfileView.as_view(), name='user_profile'),
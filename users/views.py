@@ -4,28 +4,35 @@ from django.shortcuts import render
 from rest_framework import status
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
-from .serializers import MyTokenObtainPairSerializer, RegisterSerializer, UserProfileSerializer, UserSerializer
+from .serializers import MyTokenObtainPairSerializer, RegisterSerializer, UserListSerializer, UserProfileSerializer, \
+    UserSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework import generics
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes
 import json
 
+from config.fieldsets import FlatListMixin
+from config.metrics import InstrumentedViewMixin
 from .models import User
+from .policies import RolePermission
 
 
 class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
 
 
-class RegisterView(generics.CreateAPIView):
+class RegisterView(InstrumentedViewMixin, generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = (AllowAny,)
     serializer_class = RegisterSerializer
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(InstrumentedViewMixin, FlatListMixin, viewsets.ModelViewSet):
     serializer_class = UserSerializer
+    flat_serializer_class = UserListSerializer
+    permission_classes = [RolePermission]
+    policy = 'users'
     pagination_class = None
 
     def get_queryset(self):
@@ -33,7 +40,7 @@ class UserViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class UserProfileView(generics.RetrieveUpdateAPIView):
+class UserProfileView(InstrumentedViewMixin, generics.RetrieveUpdateAPIView):
     queryset = User.objects.all()
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
@@ -42,13 +49,6 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         return self.request.user
 
-    def perform_update(self, serializer):
-        signature = self.request.data.get('signature', None)
-        if signature:
-            serializer.save(signature=signature)
-        else:
-            serializer.save()
-
 
 @api_view(['GET'])
 def get_routes(request):
@@ -1,14 +1,32 @@
 # utils.py
-from django.core.mail import send_mail
-from django.conf import settings
 
 
-def send_status_change_email(user_email, application, new_status):
+def build_status_change_email(application, new_status):
     subject = f"Изменение статуса заявления #{application.id}"
     message = f"Здравствуйте, {application.student.username}!\n\n" \
               f"Статус вашего заявления \"{application.application_type.name}\" был изменен на \"{new_status}\".\n\n" \
               f"Дата подачи: {application.submission_date}\n" \
               f"Текущий статус: {new_status}\n\n" \
               f"С уважением,\nКоманда поддержки."
+    return subject, message
 
-    send_mail(subject, message, settings.EMAIL_HOST_USER, [user_email])
+
+def make_status_change_email(user_email, application, new_status):
+    """Несохранённое письмо для outbox, удобно для bulk_create."""
+    from applications.models import OutboxEmail
+
+    subject, message = build_status_change_email(application, new_status)
+    return OutboxEmail(recipient=user_email, subject=subject, body=message)
+
+
+def queue_status_change_email(user_email, application, new_status):
+    """
+    Кладёт письмо об изменении статуса в outbox.
+
+    Вызывать внутри той же транзакции, что и смену статуса: письмо уйдёт
+    только если транзакция зафиксирована. Отправкой занимается команда
+    send_outbox_emails.
+    """
+    email = make_status_change_email(user_email, application, new_status)
+    email.save()
+    return email